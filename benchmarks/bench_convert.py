@@ -0,0 +1,251 @@
+"""
+Benchmark the conversion pipelines on a synthetic export.
+
+Each case runs in a fresh process so its peak RSS is its own. Results, including
+per-stage times for load, extract, render, post-process and save, are written as
+JSON; pass an earlier result file with --compare to see what changed.
+
+    python benchmarks/bench_convert.py -c 500 -o bench.json
+    python benchmarks/bench_convert.py -c 500 -o bench-new.json --compare bench.json
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+STAGES = ("load", "extract", "render", "post_process", "save")
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _case_main(export_path, work_dir, config_file):
+    from gptc import main as pipeline
+
+    plan = pipeline.configure_conversion(config_file)
+    output_path = os.path.join(work_dir, "main.md" if plan.single_file_output else "main")
+    report = pipeline.main(export_path, config_file, output_path).report()
+    stages = dict.fromkeys(STAGES, None)
+    # main normalizes its output while rendering, if at all, so that stage stays None.
+    stages.update(report["stages"])
+    return report["seconds"], report["counters"].get("conversations", 0), stages
+
+
+def _case_simple_converter(export_path, work_dir, config_file):
+    from gptc import simple_converter
+    from gptc.conversation_tree import linearize_conversation
+    from gptc.stream_reader import iter_conversations
+
+    # Mirrors simple_converter.process_json_file one stage at a time.
+    output_dir = os.path.join(work_dir, "simple_converter")
+    os.makedirs(output_dir, exist_ok=True)
+    stages = dict.fromkeys(STAGES, 0.0)
+    count = 0
+    clock = time.perf_counter
+    start = clock()
+    conversations = iter(iter_conversations(export_path))
+    while True:
+        t0 = clock()
+        item = next(conversations, None)
+        if item is None:
+            break
+        t1 = clock()
+        messages = linearize_conversation(item).messages
+        t2 = clock()
+        buffer = [f"# {item['title']}\n\n"]
+        simple_converter.render_thread(buffer, messages)
+        md_text = "".join(buffer)
+        t3 = clock()
+        md_text = simple_converter.post_process_md_text(md_text)
+        t4 = clock()
+        with open(os.path.join(output_dir, f"{count}.md"), "w", encoding="utf-8") as f:
+            f.write(md_text)
+        t5 = clock()
+        stages["load"] += t1 - t0
+        stages["extract"] += t2 - t1
+        stages["render"] += t3 - t2
+        stages["post_process"] += t4 - t3
+        stages["save"] += t5 - t4
+        count += 1
+    return clock() - start, count, stages
+
+
+def _case_main_parallel(export_path, work_dir, config_file):
+    from gptc import main as pipeline
+
+    jobs = max(2, os.cpu_count() or 2)
+    output_path = os.path.join(work_dir, "parallel")
+    report = pipeline.main(export_path, config_file, output_path, jobs=jobs).report()
+    stages = dict(report["stages"], jobs=jobs)
+    return report["seconds"], report["counters"].get("conversations", 0), stages
+
+
+def _case_main_cached(export_path, work_dir, config_file):
+    from gptc import main as pipeline
+    from gptc.export_cache import ingest
+
+    # Only the conversion is timed; ingesting is a one-off cost per export.
+    cache_path = ingest(export_path, os.path.join(work_dir, "export.gptc"))
+    plan = pipeline.configure_conversion(config_file)
+    output_path = os.path.join(work_dir, "cached.md" if plan.single_file_output else "cached")
+    report = pipeline.main(cache_path, config_file, output_path).report()
+    stages = dict.fromkeys(STAGES, None)
+    stages.update(report["stages"])
+    return report["seconds"], report["counters"].get("conversations", 0), stages
+
+
+def _case_threads_in_memory(export_path, work_dir, config_file):
+    from gptc.conversation_tree import linearize_conversation
+    from gptc.stream_reader import iter_conversations
+
+    # Holds every linearized thread at once, like a browser over the whole export
+    # would, so peak RSS measures the size of the message model.
+    clock = time.perf_counter
+    start = clock()
+    threads = [linearize_conversation(conversation) for conversation in iter_conversations(export_path)]
+    elapsed = clock() - start
+    messages = sum(len(thread.messages) for thread in threads)
+    return elapsed, len(threads), {"extract": elapsed, "messages": messages}
+
+
+CASES = {
+    "main": _case_main,
+    "main_cached": _case_main_cached,
+    "simple_converter": _case_simple_converter,
+    "main_parallel": _case_main_parallel,
+    "threads_in_memory": _case_threads_in_memory,
+}
+
+
+def _run_case(name, export_path, config_file, results):
+    logging.disable(logging.CRITICAL)
+    baseline_rss = _peak_rss_mb()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            total, count, stages = CASES[name](export_path, work_dir, config_file)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    results.put({
+        "case": name,
+        "seconds": total,
+        "conversations": count,
+        "conversations_per_second": count / total if total else None,
+        "mb_per_second": os.path.getsize(export_path) / (1 << 20) / total if total else None,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_child_rss_mb": children or None,
+        "stages": stages,
+    })
+
+
+def run_case(name, export_path, config_file=None):
+    """
+    Run one benchmark case in a fresh process and return its result dictionary.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_case, args=(name, export_path, config_file, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(previous, current):
+    """Print the relative change of every timing and memory figure between two runs."""
+    before = {case["case"]: case for case in previous["cases"]}
+    for case in current["cases"]:
+        old = before.get(case["case"])
+        if old is None:
+            continue
+        print(f"{case['case']}:")
+        figures = [("seconds", case["seconds"], old["seconds"]),
+                   ("peak_rss_mb", case["peak_rss_mb"], old["peak_rss_mb"])]
+        for stage in STAGES:
+            new_value = case["stages"].get(stage)
+            old_value = old["stages"].get(stage)
+            if new_value is not None and old_value:
+                figures.append((stage, new_value, old_value))
+        for label, new_value, old_value in figures:
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            print(f"  {label:>14}: {old_value:10.3f} -> {new_value:10.3f} ({change:+.1f}%)")
+
+
+def main(argv=None):
+    from gptc.synthetic_export import add_generate_arguments, generate_from_args
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_generate_arguments(parser, output=False)
+    parser.add_argument("-o", "--results", default="bench_results.json",
+                        help="Where to write the JSON results.")
+    parser.add_argument("--export", help="Benchmark an existing export instead of generating one.")
+    parser.add_argument("--config", help="Config file to convert with.")
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="Run only this case (may be repeated).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        export_path = args.export
+        if export_path is None:
+            export_path = os.path.join(tmp, "conversations.json")
+            generate_from_args(args, export_path)
+        export_path = os.path.abspath(export_path)
+
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "export": {
+                "path": args.export,
+                "bytes": os.path.getsize(export_path),
+                "conversations": args.conversations,
+                "messages": args.messages,
+                "branching": args.branching,
+                "part_size": args.part_size,
+                "unicode_mix": args.unicode_mix,
+                "seed": args.seed,
+            },
+            "cases": [],
+        }
+        for name in args.case or CASES:
+            result = run_case(name, export_path, args.config and os.path.abspath(args.config))
+            report["cases"].append(result)
+            print(f"{name}: {result['seconds']:.2f}s, "
+                  f"{result['conversations_per_second']:.1f} conversations/s, "
+                  f"peak RSS {result['peak_rss_mb']:.1f} MB")
+
+    with open(args.results, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            _compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
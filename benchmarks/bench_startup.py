@@ -0,0 +1,134 @@
+"""
+Benchmark how long the `gptc` command takes to start.
+
+Each case runs `python -m gptc.cli ...` in a fresh interpreter several times and
+records the median wall-clock time, plus the gptc and third-party modules it
+imported, so a subcommand that starts importing something heavy shows up. Results
+are written as JSON; pass an earlier result file with --compare to see what changed.
+
+    python benchmarks/bench_startup.py -o startup.json
+    python benchmarks/bench_startup.py -o startup-new.json --compare startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = str(Path(__file__).resolve().parents[1] / "src")
+
+# Case name -> arguments to the gptc command. Each only parses its arguments.
+CASES = {
+    "help": ["--help"],
+    "convert": ["convert", "--help"],
+    "ingest": ["ingest", "--help"],
+    "merge": ["merge", "--help"],
+    "serve": ["serve", "--help"],
+    "search": ["search", "--help"],
+    "gui": ["gui", "--help"],
+    "ratios": ["ratios", "--help"],
+    "scan-images": ["scan-images", "--help"],
+    "generate": ["generate", "--help"],
+}
+
+# Imports worth flagging in a command that does not need them.
+HEAVY_MODULES = ("PyQt5", "markdown", "rich", "numpy", "toml", "icecream", "asyncio", "sqlite3")
+
+_REPORT_IMPORTS = (
+    "import runpy, sys\n"
+    "sys.argv = ['gptc'] + sys.argv[1:]\n"
+    "try:\n"
+    "    runpy.run_module('gptc.cli', run_name='__main__')\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    "print('\\n' + ' '.join(sorted(sys.modules)), file=sys.stderr)\n"
+)
+
+
+def _environment():
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, (SRC, environment.get("PYTHONPATH"))))
+    return environment
+
+
+def run_case(arguments, repeat):
+    """
+    Return (median seconds, names of the modules imported) for one gptc invocation.
+    """
+    environment = _environment()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "gptc.cli", *arguments], env=environment,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    result = subprocess.run([sys.executable, "-c", _REPORT_IMPORTS, *arguments], env=environment,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = result.stderr.strip().splitlines()[-1].split() if result.stderr.strip() else []
+    return statistics.median(times), modules
+
+
+def _compare(previous, current):
+    """Print the relative change of every case's start-up time between two runs."""
+    before = {case["case"]: case for case in previous["cases"]}
+    for case in current["cases"]:
+        old = before.get(case["case"])
+        if old is None:
+            continue
+        change = (case["seconds"] - old["seconds"]) / old["seconds"] * 100 if old["seconds"] else 0.0
+        print(f"{case['case']:>12}: {old['seconds'] * 1000:7.1f} ms -> "
+              f"{case['seconds'] * 1000:7.1f} ms ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-o", "--results", default="startup_results.json",
+                        help="Where to write the JSON results.")
+    parser.add_argument("-n", "--repeat", type=int, default=10,
+                        help="Runs per case; the median is reported.")
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="Run only this case (may be repeated).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        subprocess.run([sys.executable, "-c", "pass"])
+    interpreter = (time.perf_counter() - start) / args.repeat
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "interpreter_seconds": interpreter,
+        "cases": [],
+    }
+    print(f"bare interpreter: {interpreter * 1000:.1f} ms")
+    for name in args.case or CASES:
+        seconds, modules = run_case(CASES[name], args.repeat)
+        top_level = {module.partition(".")[0] for module in modules}
+        heavy = [module for module in HEAVY_MODULES if module in top_level]
+        report["cases"].append({
+            "case": name,
+            "arguments": CASES[name],
+            "seconds": seconds,
+            "gptc_modules": sorted(module for module in modules if module.startswith("gptc.")),
+            "heavy_modules": heavy,
+        })
+        print(f"{name}: {seconds * 1000:.1f} ms" + (f" (imports {', '.join(heavy)})" if heavy else ""))
+
+    with open(args.results, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            _compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,13 @@ setup(
     version='0.1.0',
     packages=find_packages(where='src'),
     package_dir={'': 'src'},
+    package_data={'gptc': ['config.toml']},
     install_requires=[
         # Your dependencies here
     ],
+    entry_points={
+        'console_scripts': [
+            'gptc=gptc.cli:main',
+        ],
+    },
 )
@@ -0,0 +1,135 @@
+"""
+Browse converted output one conversation at a time.
+
+A library lists the conversations of a converted export without loading them:
+TocLibrary reads the table of contents of a single-file output and ManifestLibrary
+the manifest of a per-file output directory. The Markdown of a conversation is only
+read when it is asked for, and LRUCache keeps the HTML of the most recently viewed
+ones within a fixed budget, so memory stays flat however large the export is.
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+from gptc.manifest import MANIFEST_NAME
+from gptc.volumes import TOC_SUFFIX, read_conversation, read_toc, toc_path
+
+# Default budget of an LRUCache of rendered HTML, in characters.
+DEFAULT_CACHE_SIZE = 64 << 20
+
+
+class LRUCache:
+    """
+    A mapping that keeps its most recently used values up to a total size of
+    max_size, as measured by sizeof(value), evicting the least recently used ones.
+    A value larger than max_size on its own is not cached.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, sizeof=len):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        try:
+            value, _ = self._items[key]
+        except KeyError:
+            return default
+        self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        if size > self.max_size:
+            return
+        self._items[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.size -= evicted
+
+    def clear(self):
+        self._items.clear()
+        self.size = 0
+
+
+class TocLibrary:
+    """
+    The conversations of a single-file output, in export order, from its table of
+    contents.
+    """
+
+    def __init__(self, toc_file):
+        self.path = toc_file
+        self.toc = read_toc(toc_file)
+        self.entries = self.toc["conversations"]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def conversation_id(self, index):
+        return self.entries[index]["id"]
+
+    def title(self, index):
+        return self.entries[index]["title"] or "Untitled"
+
+    def read(self, index):
+        """
+        Return the Markdown of a conversation, reading only its bytes.
+        """
+        return read_conversation(self.path, self.entries[index], self.toc)
+
+
+class ManifestLibrary:
+    """
+    The conversations of a per-file output directory, newest first, from its
+    manifest. The manifest does not store titles, so the file name stands in.
+    """
+
+    def __init__(self, output_dir):
+        self.path = output_dir
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            conversations = json.load(f).get("conversations", {})
+        ordered = sorted(conversations.items(),
+                         key=lambda item: item[1].get("update_time") or 0, reverse=True)
+        self.entries = [(conversation_id, entry["path"]) for conversation_id, entry in ordered]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def conversation_id(self, index):
+        return self.entries[index][0]
+
+    def title(self, index):
+        return os.path.splitext(self.entries[index][1])[0]
+
+    def read(self, index):
+        with open(os.path.join(self.path, self.entries[index][1]), 'r', encoding='utf-8') as f:
+            return f.read()
+
+
+def open_library(path):
+    """
+    Open the converted output at path: a per-file output directory with a manifest,
+    a single-file output with a table of contents, or the table of contents itself.
+    """
+    if os.path.isdir(path):
+        if not os.path.exists(os.path.join(path, MANIFEST_NAME)):
+            raise ValueError(f"{path} has no {MANIFEST_NAME}; convert it with --incremental first.")
+        return ManifestLibrary(path)
+    if path.endswith(TOC_SUFFIX):
+        return TocLibrary(path)
+    if os.path.exists(toc_path(path)):
+        return TocLibrary(toc_path(path))
+    raise ValueError(f"{path} is neither an output directory nor a single-file output with a table of contents.")
@@ -0,0 +1,239 @@
+"""
+The `gptc` command line interface.
+
+Starting up is kept cheap for scripted batch use: only the arguments of the
+subcommand being run are defined, and every subcommand imports what it needs
+(the conversion pipeline, PyQt5, markdown, rich, numpy, toml) when it runs, so
+`gptc search` or `gptc --help` never pay for the others. Measure it with
+benchmarks/bench_startup.py.
+"""
+
+import argparse
+import sys
+
+
+def _add_convert(parser):
+    from gptc.main import add_convert_arguments
+    add_convert_arguments(parser)
+
+
+def _convert(args):
+    import logging
+    from gptc.filters import filter_from_args
+    from gptc.main import main
+    from gptc.render_plan import ConfigError
+    if args.debug_sample:
+        logging.getLogger().setLevel(logging.DEBUG)
+    try:
+        stats = main(args.json_file, args.config, args.output, jobs=args.jobs,
+                     incremental=args.incremental, prune=args.prune, index_path=args.index,
+                     stats_path=args.stats, sample_every=args.debug_sample,
+                     conversation_filter=filter_from_args(args))
+    except ConfigError as e:
+        print(f"gptc convert: {e}", file=sys.stderr)
+        return 2
+    # Conversations that failed, or a run that could not read or write at all.
+    return 1 if stats.counters["failed"] or stats.counters["errors"] else 0
+
+
+def _add_ingest(parser):
+    parser.add_argument("export", help="Path to the exported conversations.json or .zip archive.")
+    parser.add_argument("-o", "--output",
+                        help="Path of the cache (default: the export path with a .gptc suffix).")
+
+
+def _ingest(args):
+    from gptc.export_cache import ingest
+    ingest(args.export, args.output)
+    return 0
+
+
+def _add_merge(parser):
+    parser.add_argument("snapshots", nargs="+",
+                        help="Exports (conversations.json or .zip) to merge, oldest first.")
+    parser.add_argument("-o", "--output", required=True,
+                        help="Merged export to write; a .gptc path writes an export cache instead.")
+
+
+def _merge(args):
+    from gptc.merge import merge_snapshots
+    merge_snapshots(args.snapshots, args.output)
+    return 0
+
+
+def _add_serve(parser):
+    from gptc.main import DEFAULT_CONFIG_PATH
+    from gptc.server import DEFAULT_CACHE_MB, DEFAULT_HOST, DEFAULT_PORT
+    parser.add_argument("source", help="Path to an export cache, or to an export to ingest first.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH,
+                        help="Path to the TOML configuration file.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="Number of rendering processes (default: one per CPU).")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB,
+                        help="Memory budget for rendered pages, in megabytes.")
+
+
+def _serve(args):
+    from gptc.render_plan import ConfigError
+    from gptc.server import serve
+    try:
+        serve(args.source, args.config, args.host, args.port, jobs=args.jobs, cache_mb=args.cache_mb)
+    except ConfigError as e:
+        print(f"gptc serve: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def _add_search(parser):
+    from gptc.search_index import DEFAULT_INDEX_PATH
+    parser.add_argument("query", help="FTS5 query, e.g. 'click AND decorator'. Words with "
+                                      "punctuation, such as gpt-4, are searched as phrases.")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path to the search database.")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="Maximum number of results.")
+
+
+def _search(args):
+    import sqlite3
+    from gptc.render_plan import format_time
+    from gptc.search_index import SearchIndex, fts_query
+
+    try:
+        search_index = SearchIndex(args.index, read_only=True)
+    except sqlite3.OperationalError as e:
+        print(f"gptc search: cannot open {args.index}: {e}", file=sys.stderr)
+        return 2
+    try:
+        results = search_index.search(fts_query(args.query), args.limit)
+    except sqlite3.Error as e:
+        print(f"gptc search: {e}", file=sys.stderr)
+        return 2
+    finally:
+        search_index.close()
+    for title, role, timestamp, model_slug, conversation_id, snippet in results:
+        model = f" ({model_slug})" if model_slug else ""
+        print(f"{title} [{conversation_id}]")
+        print(f"  {role}{model}, {format_time(timestamp)}")
+        print(f"  {snippet}")
+    return 0 if results else 1
+
+
+def _add_gui(parser):
+    parser.add_argument("path", nargs="?",
+                        help="Converted output to browse: a single-file output, its .toc.json, or an "
+                             "--incremental output directory. Without it, open the Markdown editor.")
+
+
+def _gui(args):
+    from gptc.md_gui import main
+    return main(args.path)
+
+
+def _image_size(text):
+    width, _, height = text.lower().partition("x")
+    try:
+        size = int(width), int(height)
+    except ValueError:
+        size = (0, 0)
+    if min(size) <= 0:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return size
+
+
+def _add_ratios(parser):
+    parser.add_argument("sizes", nargs="*", type=_image_size, metavar="WIDTHxHEIGHT",
+                        help="Image sizes to find the nearest SDXL bucket for.")
+    parser.add_argument("--simple", action="store_true",
+                        help="Without sizes, show only the common SDXL ratios.")
+
+
+def _ratios(args):
+    from gptc import photo_ratio_calculator
+
+    if not args.sizes:
+        if args.simple:
+            photo_ratio_calculator.sdxl_ratio_simple()
+        else:
+            photo_ratio_calculator.sdxl_ratio_complete()
+        return 0
+    widths, heights = zip(*args.sizes)
+    assignment = photo_ratio_calculator.assign_buckets(widths, heights)
+    for i, (width, height) in enumerate(args.sizes):
+        print(f"{width}x{height} -> {assignment.width[i]}x{assignment.height[i]}"
+              f" (scale {assignment.scale[i]:.4f} to {assignment.resized_width[i]}x{assignment.resized_height[i]},"
+              f" crop {assignment.crop_left[i]} left, {assignment.crop_top[i]} top)")
+    return 0
+
+
+def _add_scan_images(parser):
+    parser.add_argument("directory", help="Directory to scan for PNG, JPEG and WebP images.")
+    parser.add_argument("-o", "--output", default="buckets.csv",
+                        help="Manifest to write; .json for JSON, otherwise CSV (default: buckets.csv).")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="Number of worker processes (default: one per CPU).")
+
+
+def _scan_images(args):
+    from gptc.image_scan import scan_to_manifest
+    counts = scan_to_manifest(args.directory, args.output, jobs=args.jobs)
+    for bucket, count in counts.most_common():
+        print(f"{bucket:>10}  {count}")
+    return 0 if counts else 1
+
+
+def _add_generate(parser):
+    from gptc.synthetic_export import add_generate_arguments
+    add_generate_arguments(parser)
+
+
+def _generate(args):
+    from gptc.synthetic_export import generate_from_args
+    print(f"Wrote {generate_from_args(args)} bytes to {args.output}.")
+    return 0
+
+
+# Subcommand name -> (help, function adding its arguments, function running it).
+COMMANDS = {
+    "convert": ("Convert an export to Markdown.", _add_convert, _convert),
+    "ingest": ("Parse an export once into a cache that convert reads much faster.", _add_ingest, _ingest),
+    "merge": ("Merge export snapshots, keeping the newest version of each conversation.",
+              _add_merge, _merge),
+    "serve": ("Browse an export over HTTP, rendering conversations on demand.", _add_serve, _serve),
+    "search": ("Search the full-text index built by convert --index.", _add_search, _search),
+    "gui": ("Browse converted output, or edit Markdown with a live preview.", _add_gui, _gui),
+    "ratios": ("Show the SDXL resolutions, or the nearest one for image sizes.", _add_ratios, _ratios),
+    "scan-images": ("Assign the images in a directory tree to SDXL buckets.",
+                    _add_scan_images, _scan_images),
+    "generate": ("Write a synthetic export for benchmarking.", _add_generate, _generate),
+}
+
+
+def build_parser(commands=None):
+    """
+    Return the argument parser. Only the subcommands named in `commands` get their
+    arguments, which may import the modules behind them; None means all of them.
+    """
+    parser = argparse.ArgumentParser(
+        prog="gptc", description="Convert and search ChatGPT conversation exports.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (help_text, add_arguments, run) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        if commands is None or name in commands:
+            add_arguments(subparser)
+        subparser.set_defaults(func=run)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # The top-level parser has no options of its own, so the first word is the subcommand.
+    command = next((arg for arg in argv if not arg.startswith("-")), None)
+    args = build_parser(commands=(command,)).parse_args(argv)
+    import logging
+    logging.basicConfig(level=logging.INFO)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Turn the `mapping` message tree of an exported conversation into ordered threads.
+
+Each conversation stores its messages as nodes keyed by id and linked through
+`parent`/`children`. Regenerated replies create sibling branches; `current_node`
+points at the leaf that was on screen when the export was taken.
+"""
+
+from gptc.models import Conversation, Message
+
+
+def find_root(mapping):
+    """
+    Return the id of the root node of a mapping, or None if the mapping is empty.
+    """
+    for node_id, node in mapping.items():
+        parent = node.get("parent")
+        if parent is None or parent not in mapping:
+            return node_id
+    return None
+
+
+def _latest_leaf(mapping, node_id):
+    """Follow the most recent child of each node until a leaf is reached."""
+    seen = set()
+    while node_id not in seen:
+        seen.add(node_id)
+        children = [c for c in mapping[node_id].get("children") or () if c in mapping]
+        if not children:
+            break
+        node_id = children[-1]
+    return node_id
+
+
+def current_path(mapping, leaf_id=None):
+    """
+    Return the node ids from the root to leaf_id in order.
+
+    Without a leaf, or when the leaf is unknown, the most recent branch is followed.
+    The walk climbs parent links from the leaf, so it is linear in the thread length.
+    """
+    if not mapping:
+        return []
+    if leaf_id not in mapping:
+        root = find_root(mapping)
+        if root is None:
+            return []
+        leaf_id = _latest_leaf(mapping, root)
+
+    path = []
+    seen = set()
+    node_id = leaf_id
+    while node_id in mapping and node_id not in seen:
+        seen.add(node_id)
+        path.append(node_id)
+        node_id = mapping[node_id].get("parent")
+    path.reverse()
+    return path
+
+
+def branch_paths(mapping):
+    """
+    Return every root-to-leaf path of node ids, one per branch.
+
+    Uses an explicit stack so very deep threads do not hit the recursion limit.
+    """
+    root = find_root(mapping)
+    if root is None:
+        return []
+
+    paths = []
+    prefix = []
+    seen = set()
+    stack = [(root, 0)]
+    while stack:
+        node_id, depth = stack.pop()
+        del prefix[depth:]
+        prefix.append(node_id)
+        seen.add(node_id)
+        children = [
+            c for c in mapping[node_id].get("children") or ()
+            if c in mapping and c not in seen
+        ]
+        if not children:
+            paths.append(list(prefix))
+            continue
+        # Push in reverse so the oldest branch is emitted first.
+        for child in reversed(children):
+            stack.append((child, depth + 1))
+    return paths
+
+
+def message_record(message):
+    """
+    Reduce a raw exported message to a Message with the fields the renderers use.
+    """
+    author = message.get("author") or {}
+    content = message.get("content") or {}
+    metadata = message.get("metadata") or {}
+
+    parts = content.get("parts")
+    if parts is None:
+        text = content.get("text")
+        parts = [text] if text is not None else []
+
+    return Message(
+        id=message.get("id"),
+        role=author.get("role"),
+        name=author.get("name"),
+        content_type=content.get("content_type"),
+        parts=parts,
+        create_time=message.get("create_time"),
+        status=message.get("status"),
+        end_turn=message.get("end_turn"),
+        weight=message.get("weight"),
+        is_user_system_message=metadata.get("is_user_system_message"),
+        user_context_message_data=metadata.get("user_context_message_data"),
+        finish_details=metadata.get("finish_details"),
+        timestamp=metadata.get("timestamp_"),
+        message_type=metadata.get("message_type"),
+        model_slug=metadata.get("model_slug"),
+        parent_id=metadata.get("parent_id"),
+    )
+
+
+def _records(mapping, path, cache):
+    records = []
+    for node_id in path:
+        record = cache.get(node_id)
+        if record is None:
+            message = mapping[node_id].get("message")
+            if message is None:
+                continue
+            record = cache[node_id] = message_record(message)
+        records.append(record)
+    return records
+
+
+def conversation_id(conversation):
+    """
+    Return the id of an exported conversation.
+    """
+    return conversation.get("conversation_id") or conversation.get("id")
+
+
+def linearize_conversation(conversation, include_branches=False):
+    """
+    Return an exported conversation as a Conversation with its messages in thread order.
+
+    `messages` follows the root to `current_node`. With include_branches, `branches`
+    lists the messages of every root-to-leaf path, including regenerated replies.
+    """
+    mapping = conversation.get("mapping") or {}
+    cache = {}
+    linear = Conversation(
+        conversation_id(conversation),
+        conversation.get("title"),
+        conversation.get("create_time"),
+        conversation.get("update_time"),
+        _records(mapping, current_path(mapping, conversation.get("current_node")), cache),
+    )
+    if include_branches:
+        linear.branches = [_records(mapping, path, cache) for path in branch_paths(mapping)]
+    return linear
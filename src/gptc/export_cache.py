@@ -0,0 +1,243 @@
+"""
+A parsed-export cache for converting the same export more than once.
+
+`gptc ingest` linearizes every conversation of an export once and stores it in a
+SQLite file, one row per conversation. Conversions then read the cache instead of
+parsing the JSON again, and decode only the conversations they actually render.
+
+Each row holds the conversation's id, title, times and content hash as columns, and
+its current thread as a zlib-compressed blob. Inside the blob, messages are lists of
+values in MESSAGE_FIELDS order. Repeated strings (ids, roles, content types, model
+slugs and the like) are stored once in the blob's string table. Regenerated
+branches are not cached.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import zlib
+
+from gptc.conversation_tree import conversation_id, linearize_conversation
+from gptc.manifest import content_hash
+from gptc.models import MESSAGE_FIELDS, Conversation, Message
+from gptc.stream_reader import iter_conversations
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".gptc"
+
+# Fields stored through the blob's string table.
+TABLED_FIELDS = frozenset((
+    "id", "role", "name", "content_type", "status", "timestamp", "message_type",
+    "model_slug", "parent_id",
+))
+
+_TABLED = tuple(field in TABLED_FIELDS for field in MESSAGE_FIELDS)
+_SQLITE_HEADER = b"SQLite format 3\x00"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    key TEXT PRIMARY KEY,
+    id TEXT,
+    position INTEGER,
+    title TEXT,
+    create_time REAL,
+    update_time REAL,
+    digest BLOB,
+    thread BLOB
+);
+CREATE INDEX IF NOT EXISTS conversations_position ON conversations (position);
+"""
+
+
+def default_cache_path(export_path):
+    """
+    Return where `gptc ingest` puts the cache of an export by default.
+    """
+    root, _ = os.path.splitext(export_path)
+    return root + CACHE_SUFFIX
+
+
+def is_export_cache(path):
+    """
+    Return True if path is an export cache rather than an export.
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
+    except OSError:
+        return False
+
+
+def encode_messages(messages):
+    """
+    Pack Messages into a compressed blob.
+    """
+    strings = []
+    index = {}
+    rows = []
+    for message in messages:
+        row = []
+        for tabled, value in zip(_TABLED, message.values()):
+            if tabled and value is not None:
+                position = index.get(value)
+                if position is None:
+                    position = index[value] = len(strings)
+                    strings.append(value)
+                value = position
+            row.append(value)
+        rows.append(row)
+    payload = json.dumps([strings, rows], ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(payload.encode("utf-8"), 1)
+
+
+def decode_messages(blob):
+    """
+    Unpack a blob written by encode_messages into Messages.
+    """
+    strings, rows = json.loads(zlib.decompress(blob))
+    return [
+        Message(*(strings[value] if tabled and value is not None else value
+                  for tabled, value in zip(_TABLED, row)))
+        for row in rows
+    ]
+
+
+class ExportCache:
+    """
+    Linearized conversations of one export, stored in SQLite.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.connection = sqlite3.connect(cache_path)
+        self.connection.executescript(_SCHEMA)
+        version = self.get_meta("version")
+        if version is not None and int(version) != CACHE_VERSION:
+            self.connection.close()
+            raise ValueError(f"{cache_path} was written by an incompatible version of gptc; "
+                             "ingest the export again.")
+
+    def get_meta(self, key):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                (key, None if value is None else str(value)))
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def ingest(self, export_path):
+        """
+        Mirror an export into the cache and return (stored, unchanged) counts.
+
+        Conversations whose content hash matches the cached copy are not linearized
+        again, and conversations that are no longer in the export are removed.
+        """
+        return self.ingest_conversations(iter_conversations(export_path, with_raw=True),
+                                         os.path.abspath(export_path))
+
+    def ingest_conversations(self, conversations, source):
+        """
+        Like ingest(), for an iterable of (conversation, raw JSON bytes) pairs;
+        source describes where they came from.
+        """
+        cursor = self.connection.cursor()
+        cached = dict(cursor.execute("SELECT key, digest FROM conversations"))
+        seen = set()
+        stored = unchanged = 0
+        for position, (conversation, raw) in enumerate(conversations):
+            digest = content_hash(raw)
+            key = conversation_id(conversation)
+            if key is None or key in seen:
+                # Rows are keyed by id; conversations without a unique one are keyed by position.
+                key = f"#{position}"
+            seen.add(key)
+            if cached.get(key) == digest:
+                cursor.execute("UPDATE conversations SET position = ? WHERE key = ?", (position, key))
+                unchanged += 1
+                continue
+            thread = linearize_conversation(conversation)
+            cursor.execute(
+                "INSERT OR REPLACE INTO conversations"
+                " (key, id, position, title, create_time, update_time, digest, thread)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, thread.id, position, thread.title, thread.create_time,
+                 thread.update_time, digest, encode_messages(thread.messages)),
+            )
+            stored += 1
+        cursor.executemany("DELETE FROM conversations WHERE key = ?",
+                           ((key,) for key in cached.keys() - seen))
+        self.set_meta("version", CACHE_VERSION)
+        self.set_meta("source", source)
+        self.connection.commit()
+        return stored, unchanged
+
+    def rows(self):
+        """
+        Yield (id, title, create time, update time, digest, blob) for every cached
+        conversation in export order, without decoding the threads.
+        """
+        yield from self.connection.execute(
+            "SELECT id, title, create_time, update_time, digest, thread"
+            " FROM conversations ORDER BY position"
+        )
+
+    def entries(self):
+        """
+        Yield (key, title, update time, digest) for every cached conversation in
+        export order; the key is what thread() looks conversations up by.
+        """
+        yield from self.connection.execute(
+            "SELECT key, title, update_time, digest FROM conversations ORDER BY position"
+        )
+
+    def thread(self, key):
+        """
+        Return the cached conversation with this id as a Conversation, or None if it
+        is not cached.
+        """
+        row = self.connection.execute(
+            "SELECT id, title, create_time, update_time, digest, thread FROM conversations WHERE key = ?",
+            (key,),
+        ).fetchone()
+        return None if row is None else row_thread(row)
+
+    def threads(self):
+        """
+        Lazily yield every cached conversation as a Conversation.
+        """
+        for row in self.rows():
+            yield row_thread(row)
+
+    def close(self):
+        self.connection.close()
+
+
+def row_thread(row):
+    """
+    Decode a row from ExportCache.rows() into a Conversation.
+    """
+    conversation_id, title, create_time, update_time, _, blob = row
+    return Conversation(conversation_id, title, create_time, update_time, decode_messages(blob))
+
+
+def ingest(export_path, cache_path=None):
+    """
+    Parse an export into its cache and return the path of the cache.
+    """
+    cache_path = cache_path or default_cache_path(export_path)
+    logging.info(f"Ingesting {export_path} into {cache_path}.")
+    cache = ExportCache(cache_path)
+    try:
+        stored, unchanged = cache.ingest(export_path)
+        logging.info(f"Export cache: {stored} stored, {unchanged} unchanged, {len(cache)} in total.")
+    finally:
+        cache.close()
+    return cache_path
@@ -0,0 +1,128 @@
+"""
+Select which conversations of an export are converted.
+
+Filters are applied by the reader, before a conversation is hashed, linearized or
+rendered, so conversations that do not match cost little more than parsing them.
+"""
+
+import argparse
+import re
+from datetime import datetime, timezone
+
+from gptc.conversation_tree import current_path
+
+
+def parse_date(value):
+    """
+    Parse an ISO 8601 date or date and time into a POSIX timestamp. Times without a
+    time zone are taken to be UTC, like the times in the rendered Markdown.
+    """
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date {value!r}; use YYYY-MM-DD or YYYY-MM-DDTHH:MM.")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _title_pattern(value):
+    try:
+        return re.compile(value)
+    except re.error as e:
+        raise argparse.ArgumentTypeError(f"Invalid title pattern {value!r}: {e}")
+
+
+class ConversationFilter:
+    """
+    Match conversations last updated in [since, until), whose title matches a regular
+    expression and that contain a message from a given model. Unset criteria match
+    everything. Conversations without an update_time are judged by their create_time.
+    Only the current thread, the messages that are converted, is searched for the
+    model, whether the conversation comes from an export or from the cache.
+
+    The filter counts the conversations it rejects in `rejected`.
+    """
+
+    __slots__ = ("since", "until", "title", "model_slug", "rejected")
+
+    def __init__(self, since=None, until=None, title=None, model_slug=None):
+        self.since = since
+        self.until = until
+        self.title = re.compile(title) if isinstance(title, str) else title
+        self.model_slug = model_slug
+        self.rejected = 0
+
+    def __bool__(self):
+        return any(criterion is not None for criterion in (self.since, self.until, self.title, self.model_slug))
+
+    def matches_header(self, title, create_time, update_time):
+        """
+        Check the criteria that only need a conversation's title and times.
+        """
+        moment = update_time if update_time is not None else create_time
+        if self.since is not None and (moment is None or moment < self.since):
+            return False
+        if self.until is not None and (moment is None or moment >= self.until):
+            return False
+        if self.title is not None and not self.title.search(title or ""):
+            return False
+        return True
+
+    def uses_model(self, model_slugs):
+        """
+        Check the model criterion against the model slugs of a conversation's messages.
+        """
+        return self.model_slug is None or any(slug == self.model_slug for slug in model_slugs)
+
+    def __call__(self, conversation):
+        """
+        Return True if an exported conversation matches. The model is looked for
+        along the path from the root to `current_node`, without linearizing.
+        """
+        matched = self.matches_header(conversation.get("title"), conversation.get("create_time"),
+                                      conversation.get("update_time"))
+        if matched and self.model_slug is not None:
+            mapping = conversation.get("mapping") or {}
+            matched = self.uses_model(
+                ((mapping[node_id].get("message") or {}).get("metadata") or {}).get("model_slug")
+                for node_id in current_path(mapping, conversation.get("current_node"))
+            )
+        if not matched:
+            self.rejected += 1
+        return matched
+
+    def matches_thread(self, thread):
+        """
+        Return True if a linearized conversation matches.
+        """
+        matched = (self.matches_header(thread.title, thread.create_time, thread.update_time)
+                   and self.uses_model(record.model_slug for record in thread.messages))
+        if not matched:
+            self.rejected += 1
+        return matched
+
+
+def add_filter_arguments(parser):
+    """
+    Add the conversation filter options to an argparse parser.
+    """
+    parser.add_argument("--since", metavar="DATE", type=parse_date,
+                        help="Only convert conversations updated on or after DATE (UTC).")
+    parser.add_argument("--until", metavar="DATE", type=parse_date,
+                        help="Only convert conversations updated before DATE (UTC).")
+    parser.add_argument("--title", metavar="REGEX", type=_title_pattern,
+                        help="Only convert conversations whose title matches REGEX.")
+    parser.add_argument("--model", metavar="SLUG",
+                        help="Only convert conversations with a message from this model, e.g. gpt-4,"
+                             " in their current thread.")
+    return parser
+
+
+def filter_from_args(args):
+    """
+    Return the ConversationFilter selected by the parsed options, or None if no
+    filter option was given.
+    """
+    conversation_filter = ConversationFilter(args.since, args.until, args.title, args.model)
+    return conversation_filter or None
@@ -0,0 +1,230 @@
+"""
+Assign the images under a directory to SDXL buckets from their headers alone.
+
+Image dimensions are read from the first bytes of each file (the PNG IHDR chunk,
+the JPEG start-of-frame segment, the WebP VP8/VP8L/VP8X header) without decoding
+any pixels. JPEG EXIF orientations that rotate the image by 90 degrees swap the
+dimensions, so portrait photos land in portrait buckets.
+
+Files are read and bucketed in batches on a process pool; at most `jobs * 2`
+batches are in flight, so the parent only ever holds the rows it is writing. The
+manifest is CSV (one row per file, with bucket counts in `<name>.buckets.csv`) or
+JSON ({"files": [...], "buckets": {"1024x1024": count, ...}}), by its extension.
+"""
+
+import csv
+import json
+import logging
+import os
+import struct
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+IMAGE_EXTENSIONS = frozenset((".png", ".jpg", ".jpeg", ".jpe", ".webp"))
+MANIFEST_FIELDS = ("path", "width", "height", "bucket_width", "bucket_height", "scale",
+                   "resized_width", "resized_height", "crop_left", "crop_top")
+
+# Start-of-frame markers, which carry the frame size; 0xC4, 0xC8 and 0xCC are not frames.
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field.
+_JPEG_STANDALONE = frozenset(range(0xD0, 0xD8)) | {0x01, 0xD8}
+_EXIF_ORIENTATION_TAG = 0x0112
+
+
+def _exif_orientation(segment):
+    """Return the orientation in a JPEG APP1 EXIF segment, or 1 if there is none."""
+    if not segment.startswith(b"Exif\x00\x00"):
+        return 1
+    tiff = segment[6:]
+    byte_order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if byte_order is None or len(tiff) < 8:
+        return 1
+    ifd = struct.unpack(byte_order + "I", tiff[4:8])[0]
+    if ifd + 2 > len(tiff):
+        return 1
+    count = struct.unpack(byte_order + "H", tiff[ifd:ifd + 2])[0]
+    for entry in range(ifd + 2, min(ifd + 2 + count * 12, len(tiff) - 11), 12):
+        tag, _, _, value = struct.unpack(byte_order + "HHIH", tiff[entry:entry + 10])
+        if tag == _EXIF_ORIENTATION_TAG:
+            return value
+    return 1
+
+
+def _jpeg_size(f):
+    orientation = None
+    while True:
+        byte = f.read(1)
+        if byte != b"\xff":
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in _JPEG_STANDALONE:
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image or start of scan without a frame header.
+            return None
+        length = struct.unpack(">H", f.read(2))[0]
+        if length < 2:
+            return None
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack(">xHH", f.read(5))
+            if orientation in (5, 6, 7, 8):
+                width, height = height, width
+            return width, height
+        if marker == 0xE1 and orientation is None:
+            orientation = _exif_orientation(f.read(length - 2))
+            continue
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _webp_size(header):
+    chunk = header[12:16]
+    if chunk == b"VP8 " and header[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and header[20:21] == b"\x2f":
+        bits = struct.unpack("<I", header[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return (int.from_bytes(header[24:27], "little") + 1,
+                int.from_bytes(header[27:30], "little") + 1)
+    return None
+
+
+def read_image_size(path):
+    """
+    Return the (width, height) of a PNG, JPEG or WebP image from its header, or
+    None if the file is not one of those or its header is damaged.
+    """
+    with open(path, "rb") as f:
+        header = f.read(30)
+        try:
+            if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+                return struct.unpack(">II", header[16:24])
+            if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+                return _webp_size(header)
+            if header.startswith(b"\xff\xd8"):
+                f.seek(2)
+                return _jpeg_size(f)
+        except struct.error:
+            # Truncated header.
+            return None
+    return None
+
+
+def iter_image_files(root):
+    """
+    Yield the paths of the images under root, relative to it, in sorted order.
+    """
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.relpath(os.path.join(directory, filename), root)
+
+
+def _scan_batch(root, paths):
+    """
+    Read the sizes of a batch of images and bucket them. Returns the manifest rows
+    of the readable images and the paths of the others.
+    """
+    from gptc.photo_ratio_calculator import assign_buckets
+
+    sizes = []
+    unreadable = []
+    for path in paths:
+        try:
+            size = read_image_size(os.path.join(root, path))
+        except OSError:
+            size = None
+        if size is None or not all(size):
+            unreadable.append(path)
+        else:
+            sizes.append((path, *size))
+    if not sizes:
+        return [], unreadable
+    names, widths, heights = zip(*sizes)
+    assignment = assign_buckets(widths, heights)
+    rows = [
+        (name, int(width), int(height), int(bucket_width), int(bucket_height), round(float(scale), 6),
+         int(resized_width), int(resized_height), int(crop_left), int(crop_top))
+        for name, width, height, bucket_width, bucket_height, scale, resized_width, resized_height,
+        crop_left, crop_top in zip(names, widths, heights, assignment.width, assignment.height,
+                                   assignment.scale, assignment.resized_width,
+                                   assignment.resized_height, assignment.crop_left, assignment.crop_top)
+    ]
+    return rows, unreadable
+
+
+def scan_images(root, jobs=None, batch_size=256):
+    """
+    Yield a manifest row (see MANIFEST_FIELDS) for every readable image under root,
+    in sorted path order. Unreadable images are logged and skipped.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    paths = iter_image_files(root)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        while True:
+            batch = list(islice(paths, batch_size))
+            if batch:
+                pending.append(executor.submit(_scan_batch, root, batch))
+            if pending and (not batch or len(pending) >= jobs * 2):
+                rows, unreadable = pending.popleft().result()
+                for path in unreadable:
+                    logging.warning(f"Skipping {path}: not a readable PNG, JPEG or WebP image.")
+                yield from rows
+            elif not batch:
+                return
+
+
+def bucket_counts_path(output_path):
+    """
+    Return the path of the bucket counts written next to a CSV manifest.
+    """
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.buckets{ext}"
+
+
+def write_manifest(rows, output_path):
+    """
+    Write manifest rows to output_path as CSV or, for a .json path, JSON, and
+    return the Counter of images per "WIDTHxHEIGHT" bucket.
+    """
+    counts = Counter()
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        if output_path.lower().endswith(".json"):
+            f.write('{"files": [')
+            for i, row in enumerate(rows):
+                counts[f"{row[3]}x{row[4]}"] += 1
+                f.write(",\n" if i else "\n")
+                f.write(json.dumps(dict(zip(MANIFEST_FIELDS, row))))
+            f.write('\n], "buckets": ')
+            f.write(json.dumps(dict(counts.most_common()), indent=1))
+            f.write("}\n")
+            return counts
+        writer = csv.writer(f)
+        writer.writerow(MANIFEST_FIELDS)
+        for row in rows:
+            counts[f"{row[3]}x{row[4]}"] += 1
+            writer.writerow(row)
+    with open(bucket_counts_path(output_path), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("bucket", "count"))
+        writer.writerows(counts.most_common())
+    return counts
+
+
+def scan_to_manifest(root, output_path, jobs=None):
+    """
+    Bucket every image under root and write the manifest; returns the bucket counts.
+    """
+    logging.info(f"Scanning {root} for images.")
+    counts = write_manifest(scan_images(root, jobs), output_path)
+    logging.info(f"Assigned {sum(counts.values())} images to {len(counts)} buckets; wrote {output_path}.")
+    return counts
@@ -0,0 +1,153 @@
+"""
+Counters, per-stage timers and peak memory for a conversion run.
+
+Stages of the pipeline are chained generators, so each one runs inside the next()
+of the stage after it. RunStats wraps every stage's iterator, accumulates the time
+spent producing its items and subtracts the time of the stage feeding it, giving
+each stage its own time without breaking the streaming.
+"""
+
+import json
+import logging
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+
+def peak_rss_mb():
+    """
+    Return the peak resident set size of this process in megabytes, if known.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+class _TimedIterator:
+    """Accumulate the time spent inside next() of the wrapped iterator."""
+
+    __slots__ = ("iterator", "elapsed", "items")
+
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.elapsed = 0.0
+        self.items = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            item = next(self.iterator)
+        finally:
+            self.elapsed += time.perf_counter() - start
+        self.items += 1
+        return item
+
+
+class RunStats:
+    """
+    Statistics of one run: named counters, stage times and peak memory.
+
+    Whatever the pipeline, `conversations` counts the conversations read for
+    conversion, including those that then fail; `failed` counts the ones among them
+    that were not written.
+
+    `sample_every` enables sampled debug logging: every Nth item is passed to
+    sample_debug(), and only when DEBUG logging is enabled.
+    """
+
+    def __init__(self, sample_every=0):
+        self.counters = Counter()
+        self.sample_every = sample_every
+        self._stages = []
+        self._times = {}
+        self._started = time.perf_counter()
+        self._finished = None
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def stage(self, name, iterable):
+        """
+        Wrap the iterator of a pipeline stage; stages must be registered in pipeline order.
+        """
+        timed = _TimedIterator(iterable)
+        self._stages.append((name, timed))
+        return timed
+
+    @contextmanager
+    def sink(self, name):
+        """
+        Time the block that consumes the last registered stage, excluding the time
+        spent producing that stage's items.
+        """
+        upstream = self._stages[-1][1] if self._stages else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add_time(name, elapsed - (upstream.elapsed if upstream else 0.0))
+
+    def add_time(self, name, seconds):
+        self._times[name] = self._times.get(name, 0.0) + seconds
+
+    def sample_debug(self, index, message, *args):
+        """
+        Log a debug message for every `sample_every`th item. The arguments are only
+        formatted when the message is actually emitted.
+        """
+        if (self.sample_every and index % self.sample_every == 0
+                and logging.getLogger().isEnabledFor(logging.DEBUG)):
+            logging.debug(message, *args)
+
+    def finish(self):
+        self._finished = time.perf_counter()
+
+    def stage_times(self):
+        """
+        Return the exclusive time of every stage in pipeline order.
+        """
+        times = {}
+        upstream = 0.0
+        for name, timed in self._stages:
+            times[name] = times.get(name, 0.0) + timed.elapsed - upstream
+            upstream = timed.elapsed
+        for name, seconds in self._times.items():
+            times[name] = times.get(name, 0.0) + seconds
+        return times
+
+    def report(self):
+        """
+        Return the statistics as a JSON-serializable dictionary.
+        """
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return {
+            "seconds": end - self._started,
+            "counters": dict(self.counters),
+            "stages": self.stage_times(),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def log_summary(self):
+        report = self.report()
+        counters = ", ".join(f"{value} {name}" for name, value in report["counters"].items())
+        logging.info(f"Finished in {report['seconds']:.2f}s: {counters or 'nothing processed'}.")
+        for name, seconds in report["stages"].items():
+            logging.info(f"  {name:>14}: {seconds:8.3f}s")
+        if report["peak_rss_mb"] is not None:
+            logging.info(f"  {'peak RSS':>14}: {report['peak_rss_mb']:8.1f} MB")
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
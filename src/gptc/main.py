@@ -1,215 +1,187 @@
 # Code I'm heavily trained on
 
+import argparse
 import json
 import os
 import logging
-import toml
+from functools import partial
 
-json_file_path = "src/gptc/conversations.json"
-config_file_path = "src/gptc/config.toml"
-output_path = "src/gptc/outputs"
+from gptc.conversation_tree import conversation_id, linearize_conversation
+from gptc.export_cache import ExportCache, is_export_cache, row_thread
+from gptc.filters import add_filter_arguments, filter_from_args
+from gptc.instrumentation import RunStats
+from gptc.manifest import Manifest, content_hash
+from gptc.output_writer import FilenameAllocator, OutputWriter
+from gptc.render_plan import load_plan
+from gptc.search_index import SearchIndex
+from gptc.stream_reader import iter_conversations
+from gptc.volumes import VolumeWriter
 
-logging.basicConfig(level=logging.INFO)
+# Command line defaults: the export and the output in the working directory, and
+# the configuration that ships with the package.
+DEFAULT_EXPORT_PATH = "conversations.json"
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.toml")
+DEFAULT_OUTPUT_PATH = "output"
 
 def configure_conversion(config_file=None):
     """
-    Load a configuration file to determine what fields to include in the Markdown.
+    Load a configuration file and compile it into a render plan that determines
+    what fields to include in the Markdown.
+    
+    A file that cannot be read or parsed, or that has unknown keys, raises ConfigError.
     """
     logging.info("Loading configuration.")
-    default_config = {
-        "single_file_output": True,
-        "include_title": True,
-        "include_create_time": True,
-        "include_update_time": False,
-        "message": {
-            "include_author_role": True,
-            "include_author_name": False,
-            "include_content_type": True,
-            "include_parts": True,
-            "include_status": False,
-            "include_end_turn": False,
-            "include_weight": False
-        },
-        "metadata": {
-            "include_is_user_system_message": False,
-            "include_user_context_message_data": False,
-            "include_finish_details": False,
-            "include_timestamp": False,
-            "include_message_type": False,
-            "include_model_slug": False,
-            "include_parent_id": False
-        }
-    }
     
-    if config_file:
-        try:
-            user_config = toml.load(config_file_path)
-            return {**default_config, **user_config}
-        except Exception as e:
-            logging.error(f"Failed to load config file: {e}")
-            return default_config
-    else:
-        return default_config
+    return load_plan(config_file or None)
 
-def load_json_file(file_path):
+def load_json_file(file_path, manifest=None, search_index=None, stats=None, conversation_filter=None):
     """
-    Load a JSON file and return a Python dictionary.
+    Open a JSON export, or the zip archive it was downloaded as, and return an
+    iterator that yields (manifest key, position, conversation) one conversation at
+    a time. position counts the conversations of the export that pass the filter.
+    
+    With a manifest, conversations that are unchanged since the last run are skipped
+    before they are converted, unless the search index is missing them. Conversations
+    rejected by conversation_filter are dropped by the reader as soon as they are decoded.
     """
     logging.info(f"Loading JSON file from {file_path}.")
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-        return json_data
-    except FileNotFoundError:
+    if not os.path.isfile(file_path):
         logging.error(f"File {file_path} not found.")
         return None
-    except json.JSONDecodeError:
+    is_current = search_index.is_current if search_index is not None else None
+    return _stream_conversations(file_path, manifest, is_current, stats or RunStats(),
+                                 conversation_filter)
+
+
+def _stream_conversations(file_path, manifest, is_current, stats, conversation_filter=None):
+    try:
+        conversations = iter_conversations(file_path, with_raw=True, select=conversation_filter)
+        for position, (conversation, raw) in enumerate(conversations):
+            stats.count("bytes", len(raw))
+            if manifest is not None:
+                digest = content_hash(raw)
+                if manifest.unchanged(digest, is_current):
+                    stats.count("unchanged")
+                    continue
+            key = None
+            if manifest is not None:
+                key = manifest.stage(conversation_id(conversation), conversation.get('update_time'), digest)
+            stats.count("conversations")
+            yield key, position, conversation
+        if manifest is not None:
+            manifest.complete = True
+    except (json.JSONDecodeError, ValueError):
+        stats.count("errors")
         logging.error(f"Failed to decode JSON from {file_path}.")
-        return None
     except Exception as e:
+        stats.count("errors")
         logging.error(f"An error occurred while loading the JSON file: {e}")
-        return None
-
 
-def extract_conversations(json_data, config):
-    logging.info("Extracting conversations based on configuration.")
-    
-    if not isinstance(json_data, list):
-        logging.error("JSON data is not a list.")
-        return None
-    
-    logging.info(f"json_data: {json_data}")
-    
-    extracted_conversations = []
+def load_export_cache(cache_path, manifest=None, search_index=None, stats=None,
+                      conversation_filter=None):
+    """
+    Open an export cache written by `gptc ingest` and return an iterator that yields
+    (manifest key, position, linearized conversation) one conversation at a time.
+    position counts every conversation in the cache.
     
+    Conversations are only decoded from the cache once the manifest, if any, has
+    decided they need converting and their title and times pass conversation_filter.
+    """
+    logging.info(f"Loading export cache from {cache_path}.")
     try:
-        for conversation in json_data:
-            logging.info(f"Processing conversation {conversation}")
-            extracted = {}
-            
-            # Include options for conversation
-            if config.get('include_title', False):
-                extracted['title'] = conversation.get('title', 'Untitled')
-
-            if config.get('include_create_time', False):
-                extracted['create_time'] = conversation.get('create_time', 'Unknown')
-
-            if config.get('include_update_time', False):
-                extracted['update_time'] = conversation.get('update_time', 'Unknown')
-
-            # Include options for messages
-            message_config = config.get('message', {})
-            if message_config.get('include_author_role', False):
-                extracted['author_role'] = conversation.get('author', {}).get('role', 'Unknown')
-
-            if message_config.get('include_author_name', False):
-                extracted['author_name'] = conversation.get('author', {}).get('name', 'Unknown')
-
-            if message_config.get('include_content_type', False):
-                extracted['content_type'] = conversation.get('content', {}).get('type', 'Unknown')
-
-            if message_config.get('include_parts', False):
-                extracted['parts'] = conversation.get('content', {}).get('parts', [])
-
-            if message_config.get('include_status', False):
-                extracted['status'] = conversation.get('status', 'Unknown')
-
-            if message_config.get('include_end_turn', False):
-                extracted['end_turn'] = conversation.get('end_turn', 'Unknown')
-
-            if message_config.get('include_weight', False):
-                extracted['weight'] = conversation.get('weight', 'Unknown')
-
-            # Metadata options
-            metadata_config = config.get('metadata', {})
-            if metadata_config.get('include_is_user_system_message', False):
-                extracted['is_user_system_message'] = conversation.get('is_user_system_message', 'Unknown')
-
-            if metadata_config.get('include_user_context_message_data', False):
-                extracted['user_context_message_data'] = conversation.get('user_context_message_data', 'Unknown')
-
-            if metadata_config.get('include_finish_details', False):
-                extracted['finish_details'] = conversation.get('finish_details', 'Unknown')
+        cache = ExportCache(cache_path)
+    except Exception as e:
+        logging.error(f"Failed to open export cache {cache_path}: {e}")
+        return None
+    is_current = search_index.is_current if search_index is not None else None
+    return _stream_cached_threads(cache, manifest, is_current, stats or RunStats(),
+                                  conversation_filter)
 
-            if metadata_config.get('include_timestamp', False):
-                extracted['timestamp'] = conversation.get('timestamp', 'Unknown')
 
-            if metadata_config.get('include_message_type', False):
-                extracted['message_type'] = conversation.get('message_type', 'Unknown')
+def _stream_cached_threads(cache, manifest, is_current, stats, conversation_filter=None):
+    try:
+        for position, row in enumerate(cache.rows()):
+            conversation_id, title, create_time, update_time, digest, blob = row
+            if conversation_filter is not None and not conversation_filter.matches_header(
+                    title, create_time, update_time):
+                conversation_filter.rejected += 1
+                continue
+            stats.count("bytes", len(blob))
+            if manifest is not None and manifest.unchanged(digest, is_current):
+                stats.count("unchanged")
+                continue
+            thread = row_thread(row)
+            if conversation_filter is not None and not conversation_filter.matches_thread(thread):
+                continue
+            key = None
+            if manifest is not None:
+                key = manifest.stage(conversation_id, update_time, digest)
+            stats.count("conversations")
+            yield key, position, thread
+        if manifest is not None:
+            manifest.complete = True
+    except Exception as e:
+        stats.count("errors")
+        logging.error(f"An error occurred while reading the export cache: {e}")
+    finally:
+        cache.close()
 
-            if metadata_config.get('include_model_slug', False):
-                extracted['model_slug'] = conversation.get('model_slug', 'Unknown')
 
-            if metadata_config.get('include_parent_id', False):
-                extracted['parent_id'] = conversation.get('parent_id', 'Unknown')
-            
-            extracted_conversations.append(extracted)
+def extract_conversations(json_data, plan, search_index=None, stats=None, linearized=False):
+    """
+    Yield (manifest key, position, conversation id, title, extracted) for each
+    (manifest key, position, conversation) tuple, where extracted is its ordered
+    message thread reduced to the fields enabled in the render plan.
     
-    except Exception as e:
-        logging.error(f"An error occurred while extracting conversations: {e}")
-        return None
-    logging.info(f"extracted_conversations: {extracted_conversations}")
-    return extracted_conversations
+    With linearized, json_data already yields linearized threads, as read from an
+    export cache. Every thread is also added to the search index, if one is given.
+    A conversation that fails is logged, counted as failed and skipped.
+    """
+    logging.info("Extracting conversations based on configuration.")
+    
+    if json_data is None:
+        logging.error("No JSON data provided.")
+        return
+    
+    stats = stats or RunStats()
+    
+    for i, (key, position, conversation) in enumerate(json_data):
+        try:
+            thread = conversation if linearized else linearize_conversation(conversation)
+            stats.count("messages", len(thread.messages))
+            stats.sample_debug(i, "Conversation %d: %r, %d messages", i, thread.title,
+                               len(thread.messages))
+            if search_index is not None:
+                search_index.add(thread)
+            extracted = plan.extract(thread)
+        except Exception as e:
+            stats.count("failed")
+            logging.error(f"Conversation {position + 1} failed: {type(e).__name__}: {e}")
+            continue
+        yield key, position, thread.id, thread.title, extracted
 
-def generate_markdown(conversations, config, metadata=None):
+def generate_markdown(conversations, plan, metadata=None, stats=None):
+    """
+    Yield (manifest key, position, conversation id, title, Markdown text) for each conversation
+    as it is rendered. A conversation that fails to render is logged, counted as
+    failed and skipped.
+    """
     logging.info("Generating Markdown text.")
     
-    if not conversations:
+    if conversations is None:
         logging.error("No conversations provided.")
-        return None
+        return
     
-    markdown_lines = []
-    
-    try:
-        # This is where the 'conversations' variable is sent to file
-        convo_check_dump = (f"Conversations: {type(conversations)} --> {conversations}")
-        with open("convo_dump.txt", "a", encoding="utf-8") as dump:
-            dump.write(convo_check_dump)
-            dump.write("\n")
-        for idx, conversation in enumerate(conversations):
-            logging.info(f"Processing conversation {type(conversation)} --> {conversation}")
-            # If conversation is a string, you might need to convert it to a dictionary
-            if idx > 10:
-                break
-            if isinstance(conversation, str):
-                conversation = json.loads(conversation)
+    stats = stats or RunStats()
     
+    for key, position, conversation_id, title, conversation in conversations:
         try:
-            for i, conversation in enumerate(conversations):
-                print(f"Debug: Processing conversation {conversation}")  # Debug print
-                print(f"Debug: Type of conversation is {type(conversation)}")  # Debug print
-                
-                if i > 10:  # Temporarily break the loop after 10 iterations
-                    break
-                
-                if config.get('include_title'):
-                    title = conversation.get('title', 'Untitled')
-                    markdown_lines.append(f"# {title}\n")
-                
-                if config.get('include_timestamp'):
-                    timestamp = conversation.get('timestamp', 'Unknown')
-                    markdown_lines.append(f"**Timestamp**: {timestamp}\n")
-                
-                if config.get('include_author'):
-                    author = conversation.get('author', 'Unknown')
-                    markdown_lines.append(f"**Author**: {author}\n")
-                
-                if config.get('include_content'):
-                    content_parts = conversation.get('content', [])
-                    for part in content_parts:
-                        markdown_lines.append(f"{part}\n")
-                
-                markdown_lines.append("---\n")  # Separator between conversations
-            
-            return "".join(markdown_lines)
-    
+            markdown_text = plan.render(conversation)
         except Exception as e:
-            logging.error(f"An error occurred while generating Markdown: {e}")
-            return None
-    
-    except Exception as e:
-        logging.error(f"An error occurred while generating Markdown: {e}")
-        return None
+            stats.count("failed")
+            logging.error(f"Conversation {title!r} ({conversation_id}) failed: {type(e).__name__}: {e}")
+            continue
+        yield key, position, conversation_id, title, markdown_text
 
 def get_json_sample(json_path: str, sample_size: int=10) -> None:
     with open(json_path, 'r', encoding='utf-8') as f:
@@ -220,42 +192,165 @@ def get_json_sample(json_path: str, sample_size: int=10) -> None:
         with open("json_sample.json", 'w', encoding='utf-8') as f:
             json.dump(conversation, f, indent=4)
 
-def save_to_markdown(markdown_texts, output_path, single_file_output=False):
+def save_to_markdown(markdown_texts, output_path, single_file_output=False, manifest=None,
+                     volume_size=0, stats=None):
     """
     Save the generated Markdown text to a .md file or separate .md files based on the configuration.
+    
+    markdown_texts may be any iterable of (manifest key, position, conversation id, title,
+    text) tuples; each text is written as soon as it is produced. Single file output is split into
+    volumes of at most volume_size bytes when it is set, and gets a table of contents
+    either way. In multiple file mode, files are named after their title and id and
+    written on a thread pool; each is recorded in the manifest, if one is given, once
+    it is on disk. Files that fail to write are counted as failed in stats.
     """
     logging.info("Saving to Markdown file(s).")
     
-    if not markdown_texts:
+    if markdown_texts is None:
         logging.error("No Markdown text provided.")
         return
     
+    stats = stats or RunStats()
+    
     try:
         if single_file_output:
             logging.info("Single file output.")
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write("\n---\n".join(markdown_texts))
+            with VolumeWriter(output_path, volume_size) as writer:
+                for _, _, conversation_id, title, markdown_text in markdown_texts:
+                    writer.write(conversation_id, title, markdown_text)
         else:
             logging.info("Multiple file output.")
-            os.makedirs(output_path, exist_ok=True)
-            for i, markdown_text in enumerate(markdown_texts):
-                logging.info(f"Saving: {markdown_text}")
-                if i > 10:
-                    break
-                output_file = os.path.join(output_path, f"conversation_{i+1}.md")
-                logging.info(f"Saving to {output_file}.")
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(markdown_text)
+            allocator = (FilenameAllocator(manifest.paths(), manifest.reclaimable)
+                         if manifest is not None else FilenameAllocator())
+            with OutputWriter(output_path) as writer:
+                for key, position, conversation_id, title, markdown_text in markdown_texts:
+                    filename = allocator.allocate(title, conversation_id, position, key)
+                    logging.debug("Saving to %s.", filename)
+                    on_done = partial(manifest.record, key, filename) if manifest is not None else None
+                    writer.write(filename, markdown_text, on_done)
+            if writer.failures:
+                stats.count("failed", writer.failures)
+                if manifest is not None:
+                    # Conversations that failed to write were not seen, so pruning is unsafe.
+                    manifest.complete = False
     
     except Exception as e:
+        stats.count("errors")
         logging.error(f"An error occurred while saving the Markdown files: {e}")
 
-def main(json_file_path, config_file_path=None, output_path="./output"):
-    config = configure_conversion(config_file_path)
-    json_data = load_json_file(json_file_path)
-    conversations = extract_conversations(json_data, config)
-    markdown_texts = generate_markdown(conversations, config)
-    save_to_markdown(markdown_texts, output_path, config.get("single_file_output"))
+def open_manifest(plan, output_path, incremental):
+    """
+    Return the manifest of a per-file output directory, or None when the run is
+    not incremental.
+    """
+    if not incremental:
+        return None
+    if plan.single_file_output:
+        logging.warning("Incremental conversion needs multiple file output; converting everything.")
+        return None
+    os.makedirs(output_path, exist_ok=True)
+    return Manifest.load(output_path, plan.fingerprint)
+
+def close_manifest(manifest, prune=False):
+    if manifest is None:
+        return
+    if prune:
+        logging.info(f"Pruned {manifest.prune()} deleted conversations.")
+    manifest.save()
+
+def main(json_file_path, config_file_path=None, output_path="./output", jobs=1,
+         incremental=False, prune=False, index_path=None, stats_path=None, sample_every=0,
+         conversation_filter=None):
+    """
+    Convert an export, or an export cache written by `gptc ingest`, and return the
+    RunStats of the run. The summary is logged and, with stats_path, also written
+    there as JSON.
+    
+    With a conversation_filter, only the conversations it matches are converted.
+    """
+    stats = RunStats(sample_every)
+    if conversation_filter and prune:
+        # Output of filtered-out conversations is not stale, so nothing may be pruned.
+        logging.warning("--prune is ignored when converting a filtered subset.")
+        prune = False
+    search_index = SearchIndex(index_path) if index_path else None
+    cached = is_export_cache(json_file_path)
+    if cached and jobs > 1:
+        logging.info("Converting from an export cache in a single process.")
+    try:
+        if jobs > 1 and not cached:
+            from gptc.parallel import convert_parallel
+            convert_parallel(json_file_path, config_file_path, output_path, jobs,
+                             incremental=incremental, prune=prune, search_index=search_index,
+                             stats=stats, conversation_filter=conversation_filter)
+        else:
+            plan = configure_conversion(config_file_path)
+            manifest = open_manifest(plan, output_path, incremental)
+            if cached:
+                json_data = load_export_cache(json_file_path, manifest, search_index, stats,
+                                              conversation_filter)
+            else:
+                json_data = load_json_file(json_file_path, manifest, search_index, stats,
+                                           conversation_filter)
+            if json_data is None:
+                stats.count("errors")
+            else:
+                json_data = stats.stage("load", json_data)
+            conversations = stats.stage("extract", extract_conversations(json_data, plan, search_index,
+                                                                         stats, linearized=cached))
+            markdown_texts = stats.stage("render", generate_markdown(conversations, plan,
+                                                                     stats=stats))
+            with stats.sink("save"):
+                save_to_markdown(markdown_texts, output_path, plan.single_file_output, manifest,
+                                 plan.volume_size, stats)
+            if manifest is not None and stats.counters["failed"]:
+                # Failed conversations were not seen, so their old output must not be pruned.
+                manifest.complete = False
+            close_manifest(manifest, prune)
+    finally:
+        if search_index is not None:
+            search_index.close()
+    if conversation_filter is not None:
+        stats.count("filtered", conversation_filter.rejected)
+    stats.finish()
+    stats.log_summary()
+    if stats_path:
+        stats.write_json(stats_path)
+    return stats
+
+def add_convert_arguments(parser):
+    """
+    Add the conversion options to an argparse parser.
+    """
+    parser.add_argument("json_file", nargs="?", default=DEFAULT_EXPORT_PATH,
+                        help="Path to the exported conversations.json, the export's .zip archive or an export cache.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH,
+                        help="Path to the TOML configuration file.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH,
+                        help="Output file (single-file mode) or directory.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of worker processes to convert with.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip conversations that are unchanged since the last run.")
+    parser.add_argument("--prune", action="store_true",
+                        help="With --incremental, delete output for conversations no longer in the export.")
+    parser.add_argument("--index", metavar="PATH",
+                        help="Also add every message to a full-text search database at PATH.")
+    parser.add_argument("--stats", metavar="PATH",
+                        help="Write the run's counters, stage times and peak memory to PATH as JSON.")
+    parser.add_argument("--debug-sample", metavar="N", type=int, default=0,
+                        help="Log a debug line for every Nth conversation (enables DEBUG logging).")
+    add_filter_arguments(parser)
+    return parser
 
 if __name__ == "__main__":
-    main(json_file_path, config_file_path, output_path)
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    parser = add_convert_arguments(argparse.ArgumentParser(
+        description="Convert a ChatGPT conversations.json export to Markdown."))
+    args = parser.parse_args()
+    if args.debug_sample:
+        logging.getLogger().setLevel(logging.DEBUG)
+    main(args.json_file, args.config, args.output, jobs=args.jobs,
+         incremental=args.incremental, prune=args.prune, index_path=args.index,
+         stats_path=args.stats, sample_every=args.debug_sample,
+         conversation_filter=filter_from_args(args))
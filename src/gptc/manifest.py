@@ -0,0 +1,232 @@
+"""
+Track what a previous run wrote so unchanged conversations can be skipped.
+
+The manifest lives next to the output as `.gptc-manifest.json` and maps each
+conversation id to its `update_time`, a hash of its raw JSON and the file it was
+rendered to. Conversations without an id, or whose id another conversation of the
+run already has, are keyed by that hash instead. A conversation whose raw bytes hash
+to a known value is skipped before it is linearized or rendered. Unfiltered `--jobs`
+runs also skip decoding it, since their reader only finds where each one ends.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+
+MANIFEST_NAME = ".gptc-manifest.json"
+MANIFEST_VERSION = 1
+
+# mkstemp creates files readable by the owner only; written files get the usual
+# permissions instead. Read once, since changing the umask is not thread-safe.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def content_hash(raw):
+    """
+    Return a short hex digest of a conversation's raw JSON bytes.
+    """
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+@contextmanager
+def atomic_open(path, mode="w"):
+    """
+    Open a temporary file in the same directory as path for writing, and rename it
+    to path once the block finishes without an error, so readers never see a
+    partially written file.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, 0o666 & ~_UMASK)
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path, text):
+    """
+    Write text to path through a temporary file and a rename.
+    """
+    with atomic_open(path) as f:
+        f.write(text)
+
+
+class Manifest:
+    """
+    The conversations written to an output directory by previous runs.
+
+    `settings` identifies the render configuration; when it differs from the one
+    a manifest was written with, every conversation counts as changed.
+    """
+
+    def __init__(self, output_dir, settings, entries=None):
+        self.output_dir = output_dir
+        self.settings = settings
+        self.entries = entries or {}
+        self._by_hash = {entry["hash"]: cid for cid, entry in self.entries.items()}
+        self._by_path = {entry["path"]: cid for cid, entry in self.entries.items()}
+        self.seen = set()
+        self._pending = {}
+        # Set once the whole export has been read; pruning an interrupted run
+        # would delete the output of conversations it never reached.
+        self.complete = False
+        self.skipped = 0
+        self.written = 0
+
+    @property
+    def path(self):
+        return os.path.join(self.output_dir, MANIFEST_NAME)
+
+    @classmethod
+    def load(cls, output_dir, settings):
+        """
+        Load the manifest of an output directory, or start an empty one.
+        """
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(output_dir, settings)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Ignoring unreadable manifest {manifest_path}: {e}")
+            return cls(output_dir, settings)
+
+        if data.get("version") != MANIFEST_VERSION or data.get("settings") != settings:
+            logging.info("Configuration changed since the last run; regenerating everything.")
+            # Keep the entries so stale files can still be found and pruned, but
+            # forget the hashes so nothing is considered unchanged.
+            manifest = cls(output_dir, settings, data.get("conversations", {}))
+            manifest._by_hash = {}
+            return manifest
+        return cls(output_dir, settings, data.get("conversations", {}))
+
+    def unchanged(self, digest, is_current=None):
+        """
+        Return True, and mark the conversation as seen, if a conversation with this
+        raw hash was already written and its file is still on disk.
+
+        is_current(conversation_id, update_time) can veto the skip, for example when
+        another output of the run does not have the conversation yet.
+        """
+        conversation_id = self._by_hash.get(digest)
+        if conversation_id is None:
+            return False
+        entry = self.entries[conversation_id]
+        if not os.path.exists(os.path.join(self.output_dir, entry["path"])):
+            return False
+        if is_current is not None and not is_current(conversation_id, entry["update_time"]):
+            return False
+        self.seen.add(conversation_id)
+        self.skipped += 1
+        return True
+
+    def paths(self):
+        """
+        Return {relative path: manifest key} for every file in the manifest.
+        """
+        return dict(self._by_path)
+
+    def reclaimable(self, relative_path):
+        """
+        Return True if relative_path was written for a conversation without an id
+        that has not been seen in this run, so a changed version of it may take the
+        file over.
+        """
+        key = self._by_path.get(relative_path)
+        if key is None or self._taken(key):
+            return False
+        # Conversations without an id are keyed by their digest.
+        return key.startswith(self.entries[key]["hash"])
+
+    def _taken(self, key):
+        return key in self.seen or key in self._pending
+
+    def stage(self, conversation_id, update_time, digest):
+        """
+        Remember a changed conversation that is about to be rendered, and return the
+        key to record it under: its id, or its digest when it has no id or the id is
+        already taken in this run.
+        """
+        key = conversation_id
+        if not key or self._taken(key):
+            key = digest
+            number = 1
+            while self._taken(key):
+                # Identical copies of a conversation without an id.
+                number += 1
+                key = f"{digest}-{number}"
+        self._pending[key] = (update_time, digest)
+        return key
+
+    def record(self, key, relative_path):
+        """
+        Record a staged conversation that was just written, removing its previous
+        file if it was rendered under a different name. An entry whose file was
+        taken over is dropped.
+        """
+        update_time, digest = self._pending.pop(key)
+        previous = self.entries.get(key)
+        if previous is not None:
+            self._by_hash.pop(previous["hash"], None)
+            if previous["path"] != relative_path:
+                self._by_path.pop(previous["path"], None)
+                self._remove(previous["path"])
+        replaced = self._by_path.get(relative_path)
+        if replaced is not None and replaced != key:
+            self._by_hash.pop(self.entries.pop(replaced)["hash"], None)
+        self._by_path[relative_path] = key
+        self.entries[key] = {
+            "update_time": update_time,
+            "hash": digest,
+            "path": relative_path,
+        }
+        self._by_hash[digest] = key
+        self.seen.add(key)
+        self.written += 1
+
+    def prune(self):
+        """
+        Delete the files of conversations that were not seen in this run and drop
+        them from the manifest. Returns the number of conversations pruned.
+        """
+        if not self.complete:
+            logging.warning("The export was not read to the end; not pruning.")
+            return 0
+        stale = [cid for cid in self.entries if cid not in self.seen]
+        for conversation_id in stale:
+            entry = self.entries.pop(conversation_id)
+            self._by_hash.pop(entry["hash"], None)
+            self._by_path.pop(entry["path"], None)
+            self._remove(entry["path"])
+        return len(stale)
+
+    def _remove(self, relative_path):
+        try:
+            os.remove(os.path.join(self.output_dir, relative_path))
+        except FileNotFoundError:
+            pass
+
+    def save(self):
+        """
+        Atomically write the manifest back to the output directory.
+        """
+        data = {
+            "version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "conversations": self.entries,
+        }
+        atomic_write_text(self.path, json.dumps(data, indent=1))
+        logging.info(f"Manifest: {self.written} written, {self.skipped} unchanged.")
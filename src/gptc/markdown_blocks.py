@@ -0,0 +1,81 @@
+"""
+Render Markdown one block at a time, reusing the HTML of unchanged blocks.
+
+A document is split at blank lines, except inside fenced code and before indented
+lines, which continue the previous block (list items, indented code). Each block is
+rendered on its own and its HTML cached by its text, so editing one paragraph of a
+large conversation only re-renders that paragraph. Constructs that refer across
+blocks, such as reference-style links, only resolve within their own block.
+"""
+
+import markdown
+
+from gptc.markdown_normalize import FENCE, closes_fence
+
+
+def split_blocks(text):
+    """
+    Split Markdown text into blocks; joining the blocks gives back the text.
+    """
+    blocks = []
+    current = []
+    fence = None
+    after_blank = False
+    for line in text.splitlines(keepends=True):
+        if fence is not None:
+            current.append(line)
+            if closes_fence(line, fence):
+                fence = None
+            continue
+        if not line.strip():
+            current.append(line)
+            after_blank = True
+            continue
+        if after_blank and current and line[0] not in " \t":
+            blocks.append("".join(current))
+            current = []
+        after_blank = False
+        match = FENCE.match(line)
+        if match:
+            fence = match.group(1)
+        current.append(line)
+    if current:
+        blocks.append("".join(current))
+    return blocks
+
+
+class BlockRenderer:
+    """
+    Render documents to HTML, keeping the HTML of the blocks of the last document.
+    With escape_html, raw HTML in the text is shown as text instead of passed through,
+    for documents that are not trusted.
+
+    Not thread-safe: use one renderer per rendering thread.
+    """
+
+    def __init__(self, escape_html=False):
+        self._markdown = markdown.Markdown()
+        if escape_html:
+            self._markdown.preprocessors.deregister("html_block")
+            self._markdown.inlinePatterns.deregister("html")
+        self._cache = {}
+        # Number of blocks that had to be rendered by the last call to render().
+        self.rendered_blocks = 0
+
+    def render(self, text):
+        cache = {}
+        html_blocks = []
+        rendered = 0
+        for block in split_blocks(text):
+            html = cache.get(block)
+            if html is None:
+                html = self._cache.get(block)
+                if html is None:
+                    html = self._markdown.reset().convert(block)
+                    rendered += 1
+                cache[block] = html
+            html_blocks.append(html)
+        # Only the blocks of the current document are kept, so memory follows its size.
+        self._cache = cache
+        self.rendered_blocks = rendered
+        return "\n".join(html_blocks)
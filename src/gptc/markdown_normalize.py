@@ -0,0 +1,154 @@
+"""
+Normalize converted Markdown in a single streaming pass.
+
+Outside fenced code blocks:
+
+- runs of blank lines are collapsed into one;
+- opening code fences without a language get `text`;
+- ATX headings that do not end in punctuation get a full stop, at their own level.
+
+Fenced code is copied through unchanged. MarkdownNormalizer takes the text in
+chunks of any size, as the pipeline renders it, and carries only the unfinished
+last line, whether it is inside a fence and whether the last line was blank from
+one chunk to the next. Lines are not visited one by one in Python: a single regular
+expression finds the lines that may need a change (runs of blank lines, headings
+and fences), and the text between them is copied as it is.
+"""
+
+import re
+
+# An opening or closing code fence, at most three spaces in.
+FENCE = re.compile(r" {0,3}(`{3,}|~{3,})")
+HEADING_PUNCTUATION = (".", "?", "!", ":")
+
+# A line that may need a change: a heading, a fence, or a blank line followed by
+# another. The _NEXT_ patterns find the next such line after a newline, which the
+# regular expression engine searches for much faster than a line start.
+_CANDIDATE_LINE = r"(?P<line> {0,3}(?:#|```|~~~)|(?P<blank>[ \t\r]*\n)(?=[ \t\r]*(?:\n|\Z)))"
+_CANDIDATE = re.compile(_CANDIDATE_LINE)
+_NEXT_CANDIDATE = re.compile(r"\n" + _CANDIDATE_LINE)
+_CLOSING_FENCE_LINE = r" {0,3}(?P<fence>`{3,}|~{3,})[ \t\r]*$"
+_CLOSING_FENCE = re.compile(_CLOSING_FENCE_LINE, re.MULTILINE)
+_NEXT_CLOSING_FENCE = re.compile(r"\n" + _CLOSING_FENCE_LINE, re.MULTILINE)
+_BLANK_LINES = re.compile(r"(?:[ \t\r]*\n)*(?:[ \t\r]*\Z)?")
+_HEADING = re.compile(r" {0,3}#{1,6}(?:[ \t]|$)")
+_CLOSING_SEQUENCE = re.compile(r"[ \t]+#+$")
+
+
+def _closes(match, fence):
+    """Return True if a closing fence match closes a block opened with fence."""
+    closing = match.group("fence")
+    return closing[0] == fence[0] and len(closing) >= len(fence)
+
+
+def closes_fence(line, fence):
+    """
+    Return True if line closes a code block opened with the given fence.
+    """
+    match = _CLOSING_FENCE.match(line)
+    return match is not None and _closes(match, fence)
+
+
+def _normalize_heading(line):
+    """Return the heading with a full stop added, or None if it needs none."""
+    stripped = line.rstrip()
+    closing = _CLOSING_SEQUENCE.search(stripped)
+    title_end = closing.start() if closing else len(stripped)
+    title = stripped[:title_end]
+    if not title.lstrip(" #") or title.endswith(HEADING_PUNCTUATION):
+        return None
+    return f"{title}.{stripped[title_end:]}"
+
+
+class MarkdownNormalizer:
+    """
+    Normalize Markdown fed in chunks. feed() returns the normalized text of every
+    line the chunk completed; close() returns the rest.
+    """
+
+    __slots__ = ("_pending", "_fence", "_blank")
+
+    def __init__(self):
+        self._pending = ""
+        # The fence of the open code block, if any.
+        self._fence = None
+        # Whether the text so far ends with a blank line outside code.
+        self._blank = False
+
+    def feed(self, chunk):
+        text = self._pending + chunk
+        end = text.rfind("\n") + 1
+        self._pending = text[end:]
+        return self._normalize(text[:end]) if end else ""
+
+    def close(self):
+        text, self._pending = self._pending, ""
+        return self._normalize(text)
+
+    def _normalize(self, text):
+        pieces = []
+        copied = pos = 0
+        length = len(text)
+        if self._blank and self._fence is None:
+            # The blank line that ended the previous chunk may start a run.
+            copied = pos = _BLANK_LINES.match(text).end()
+        while pos < length:
+            if self._fence is not None:
+                # Copy the code through its closing fence unchanged.
+                match = _CLOSING_FENCE.match(text, pos) or _NEXT_CLOSING_FENCE.search(text, pos)
+                while match is not None and not _closes(match, self._fence):
+                    match = _NEXT_CLOSING_FENCE.search(text, match.end())
+                if match is None:
+                    break
+                self._fence = None
+                pos = text.find("\n", match.end()) + 1 or length
+                continue
+
+            match = _CANDIDATE.match(text, pos) or _NEXT_CANDIDATE.search(text, pos)
+            if match is None:
+                break
+            start = match.start("line")
+            end = text.find("\n", start) + 1 or length
+            if match.group("blank") is not None:
+                # Keep the first blank line of a run, drop the others.
+                pieces.append(text[copied:end])
+                copied = pos = _BLANK_LINES.match(text, end).end()
+                continue
+            line = text[start:end].rstrip("\n")
+            fence = FENCE.match(line)
+            if fence:
+                self._fence = fence.group(1)
+                replacement = line.rstrip() + "text" if not line[fence.end():].strip() else None
+            else:
+                replacement = _normalize_heading(line) if _HEADING.match(line) else None
+            if replacement is not None:
+                pieces.append(text[copied:start])
+                pieces.append(replacement + text[start + len(line):end])
+                copied = end
+            pos = end
+        pieces.append(text[copied:])
+        self._blank = (self._fence is None and length > 0
+                       and not text[text.rfind("\n", 0, length - 1) + 1:].strip())
+        return "".join(pieces)
+
+
+def normalize_chunks(chunks):
+    """
+    Lazily yield the normalized text of an iterable of Markdown chunks.
+    """
+    normalizer = MarkdownNormalizer()
+    for chunk in chunks:
+        text = normalizer.feed(chunk)
+        if text:
+            yield text
+    text = normalizer.close()
+    if text:
+        yield text
+
+
+def normalize_markdown(text):
+    """
+    Return normalized Markdown text.
+    """
+    normalizer = MarkdownNormalizer()
+    return normalizer.feed(text) + normalizer.close()
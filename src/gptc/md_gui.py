@@ -1,19 +1,120 @@
+import os
 import sys
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QTextEdit, QPushButton
+import tempfile
+from PyQt5.QtCore import (QAbstractListModel, QModelIndex, QObject, QThread, QTimer, QUrl, Qt,
+                          pyqtSignal, pyqtSlot)
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QTextEdit, QPushButton, QListView,
+                             QSplitter)
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-import markdown
 
-class MarkdownEditor(QWidget):
+from gptc.browse import LRUCache, open_library
+from gptc.markdown_blocks import BlockRenderer
+
+# Wait this long after the last keystroke before re-rendering the preview
+RENDER_DELAY_MS = 300
+# QWebEngineView.setHtml() cannot show documents of 2 MB or more
+SET_HTML_LIMIT = 2 * 1024 * 1024 - 1
+
+
+class RenderWorker(QObject):
+    """Renders Markdown off the GUI thread, skipping requests that newer ones replaced"""
+
+    rendered = pyqtSignal(int, str)
+
+    def __init__(self):
+        super().__init__()
+        self.renderer = BlockRenderer()
+        # Newest request number, set by the GUI thread
+        self.latest = 0
+
+    @pyqtSlot(int, str)
+    def render(self, generation, md_text):
+        if generation < self.latest:
+            return
+        self.rendered.emit(generation, self.renderer.render(md_text))
+
+
+class PreviewView(QWebEngineView):
+    """A web view that can also show HTML too large for setHtml"""
+
     def __init__(self):
         super().__init__()
+        self.html_file = None
+
+    def showHtml(self, html):
+        if len(html.encode('utf-8')) < SET_HTML_LIMIT:
+            self.setHtml(html)
+            return
+        # Too large for setHtml; load it from a file instead
+        if self.html_file is None:
+            fd, self.html_file = tempfile.mkstemp(prefix='gptc-preview-', suffix='.html')
+            os.close(fd)
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write('<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>')
+            f.write(html)
+            f.write('</body></html>')
+        self.load(QUrl.fromLocalFile(self.html_file))
+
+    def cleanup(self):
+        if self.html_file is not None:
+            os.remove(self.html_file)
+            self.html_file = None
+
+
+class RenderingWidget(QWidget):
+    """A widget whose Markdown is rendered by a RenderWorker on its own thread"""
+
+    renderRequested = pyqtSignal(int, str)
+
+    def __init__(self):
+        super().__init__()
+
+        self.generation = 0
+        self.viewer = PreviewView()
+
+        self.renderThread = QThread(self)
+        self.worker = RenderWorker()
+        self.worker.moveToThread(self.renderThread)
+        self.renderRequested.connect(self.worker.render)
+        self.worker.rendered.connect(self.onRendered)
+        self.renderThread.start()
+
+    def requestRender(self, md_text):
+        self.generation += 1
+        self.worker.latest = self.generation
+        self.renderRequested.emit(self.generation, md_text)
+
+    def onRendered(self, generation, html):
+        if generation == self.generation:
+            self.showRendered(html)
+
+    def showRendered(self, html):
+        self.viewer.showHtml(html)
+
+    def closeEvent(self, event):
+        self.renderThread.quit()
+        self.renderThread.wait()
+        self.viewer.cleanup()
+        super().closeEvent(event)
+
+
+class MarkdownEditor(RenderingWidget):
 
+    def __init__(self):
+        super().__init__()
         self.initUI()
 
     def initUI(self):
         layout = QVBoxLayout()
 
         self.editor = QTextEdit()
-        self.viewer = QWebEngineView()
+
+        # Live preview: re-render once typing pauses
+        self.renderTimer = QTimer(self)
+        self.renderTimer.setSingleShot(True)
+        self.renderTimer.setInterval(RENDER_DELAY_MS)
+        self.renderTimer.timeout.connect(self.renderMarkdown)
+        self.editor.textChanged.connect(self.renderTimer.start)
 
         btn = QPushButton('Render')
         btn.clicked.connect(self.renderMarkdown)
@@ -25,11 +126,80 @@ class MarkdownEditor(QWidget):
         self.setLayout(layout)
 
     def renderMarkdown(self):
-        md_text = self.editor.toPlainText()
-        html = markdown.markdown(md_text)
-        self.viewer.setHtml(html)
-
-app = QApplication(sys.argv)
-ex = MarkdownEditor()
-ex.show()
-sys.exit(app.exec_())
+        self.renderTimer.stop()
+        self.requestRender(self.editor.toPlainText())
+
+
+class ConversationListModel(QAbstractListModel):
+    """Conversation titles of a library, fetched only for the rows on screen"""
+
+    def __init__(self, library):
+        super().__init__()
+        self.library = library
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.library)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.library.title(index.row())
+        if role == Qt.ToolTipRole:
+            return self.library.conversation_id(index.row())
+        return None
+
+
+class ConversationBrowser(RenderingWidget):
+    """Lists the conversations of a converted export and renders the selected one on demand"""
+
+    def __init__(self, library, cache=None):
+        super().__init__()
+        self.library = library
+        self.cache = cache if cache is not None else LRUCache()
+        self.current = None
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+
+        self.list = QListView()
+        # Rows all have the same height, so huge lists need not measure every row
+        self.list.setUniformItemSizes(True)
+        self.list.setModel(ConversationListModel(self.library))
+        self.list.selectionModel().currentChanged.connect(self.showConversation)
+
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(self.list)
+        splitter.addWidget(self.viewer)
+        splitter.setStretchFactor(1, 3)
+
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+        self.setWindowTitle(self.library.path)
+
+    def showConversation(self, index):
+        self.current = index.row()
+        html = self.cache.get(self.current)
+        if html is not None:
+            # Drop any render still in flight for the previous selection
+            self.generation += 1
+            self.viewer.showHtml(html)
+            return
+        self.requestRender(self.library.read(self.current))
+
+    def showRendered(self, html):
+        self.cache.put(self.current, html)
+        self.viewer.showHtml(html)
+
+
+def main(path=None):
+    """Browse the converted export at path, or edit Markdown without one"""
+    app = QApplication(sys.argv[:1])
+    ex = ConversationBrowser(open_library(path)) if path else MarkdownEditor()
+    ex.show()
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,125 @@
+"""
+Merge several export snapshots into one export or export cache.
+
+Every conversation id is kept once, in its newest version by `update_time`; ties
+go to the snapshot listed last. The snapshots are streamed twice, one conversation
+at a time. The first pass records, per id, the update time, snapshot and content
+hash of the newest version. The second copies the raw JSON of exactly those
+versions. Only that index is held in memory, never a snapshot.
+
+Snapshots mostly repeat each other, so copies are told apart by the blake2b hash
+of their raw JSON, as in the manifest. A copy whose hash was already indexed is
+counted as identical and skipped, and a version present in several snapshots is
+written once. Conversations without an id cannot be matched between snapshots and
+are kept once per distinct content.
+
+Snapshots are written newest-listed first, so when they are given oldest to
+newest the merged export starts with the latest snapshot in its own order,
+followed by the conversations only older snapshots still have.
+"""
+
+import json
+import logging
+import os
+from collections import Counter
+
+from gptc.conversation_tree import conversation_id
+from gptc.export_cache import CACHE_SUFFIX, ExportCache
+from gptc.manifest import atomic_open, content_hash
+from gptc.stream_reader import iter_conversations, iter_raw_conversations
+
+
+def index_snapshots(snapshot_paths, stats=None):
+    """
+    Return {key: (update time, snapshot number, digest)} for the newest version of
+    every conversation in the snapshots. The key is the conversation id, or the
+    digest for conversations without one.
+    """
+    stats = stats if stats is not None else Counter()
+    newest = {}
+    known = {}
+    for snapshot, path in enumerate(snapshot_paths):
+        logging.info(f"Indexing snapshot {snapshot + 1}: {path}.")
+        for conversation, raw in iter_conversations(path, with_raw=True):
+            stats["read"] += 1
+            digest = content_hash(raw)
+            key = known.get(digest)
+            if key is not None:
+                stats["identical"] += 1
+                update_time, _, newest_digest = newest[key]
+                if newest_digest == digest:
+                    # Take the copy from the latest snapshot, for its order.
+                    newest[key] = (update_time, snapshot, digest)
+                continue
+            key = known[digest] = conversation_id(conversation) or digest
+            update_time = conversation.get("update_time") or 0
+            current = newest.get(key)
+            if current is not None:
+                stats["superseded"] += 1
+                if update_time < current[0]:
+                    continue
+            newest[key] = (update_time, snapshot, digest)
+    return newest
+
+
+def iter_merged(snapshot_paths, stats=None):
+    """
+    Yield the raw JSON bytes of the newest version of every conversation in the
+    snapshots, each once.
+    """
+    newest = index_snapshots(snapshot_paths, stats)
+    wanted = [set() for _ in snapshot_paths]
+    for _, snapshot, digest in newest.values():
+        wanted[snapshot].add(digest)
+    del newest
+    for snapshot in reversed(range(len(snapshot_paths))):
+        digests = wanted[snapshot]
+        if not digests:
+            continue
+        for raw in iter_raw_conversations(snapshot_paths[snapshot]):
+            digest = content_hash(raw)
+            if digest in digests:
+                digests.discard(digest)
+                yield raw
+        if digests:
+            raise ValueError(f"{snapshot_paths[snapshot]} changed while it was being merged.")
+
+
+def write_export(raw_conversations, output_path):
+    """
+    Write raw conversations as a conversations.json array, atomically. Returns the
+    number written.
+    """
+    count = 0
+    with atomic_open(output_path, "wb") as f:
+        f.write(b"[")
+        for raw in raw_conversations:
+            f.write(b",\n" if count else b"\n")
+            f.write(raw)
+            count += 1
+        f.write(b"\n]\n")
+    return count
+
+
+def merge_snapshots(snapshot_paths, output_path):
+    """
+    Merge export snapshots into output_path: an export cache if it ends in .gptc,
+    otherwise a conversations.json export. Returns the merge counters.
+    """
+    stats = Counter()
+    merged = iter_merged(snapshot_paths, stats)
+    if output_path.endswith(CACHE_SUFFIX):
+        cache = ExportCache(output_path)
+        try:
+            stored, unchanged = cache.ingest_conversations(
+                ((json.loads(raw), raw) for raw in merged),
+                "merge of " + ", ".join(os.path.abspath(path) for path in snapshot_paths))
+            stats["written"] = stored + unchanged
+        finally:
+            cache.close()
+    else:
+        stats["written"] = write_export(merged, output_path)
+    logging.info(f"Merged {len(snapshot_paths)} snapshots: {stats['read']} conversations read, "
+                 f"{stats['identical']} identical copies, {stats['superseded']} older versions, "
+                 f"{stats['written']} written to {output_path}.")
+    return stats
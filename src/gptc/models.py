@@ -0,0 +1,85 @@
+"""
+The message and conversation records that flow through the conversion pipeline.
+
+Both use __slots__, so a message costs a fixed-size object instead of a dictionary
+with its own copy of every key. Enum-like string fields (roles, content types,
+statuses, model slugs and the like) are interned, so the thousands of messages of
+an export share one copy of "assistant" or "finished_successfully".
+"""
+
+import sys
+
+MESSAGE_FIELDS = (
+    "id", "role", "name", "content_type", "parts", "create_time", "status", "end_turn",
+    "weight", "is_user_system_message", "user_context_message_data", "finish_details",
+    "timestamp", "message_type", "model_slug", "parent_id",
+)
+
+
+def intern(value):
+    """
+    Intern a string value; anything else is returned unchanged.
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+class Message:
+    """
+    One message of a conversation, reduced to the fields the renderers use.
+    """
+
+    __slots__ = MESSAGE_FIELDS
+
+    def __init__(self, id=None, role=None, name=None, content_type=None, parts=(),
+                 create_time=None, status=None, end_turn=None, weight=None,
+                 is_user_system_message=None, user_context_message_data=None,
+                 finish_details=None, timestamp=None, message_type=None, model_slug=None,
+                 parent_id=None):
+        # Fields with a small set of recurring values are interned; ids are unique.
+        self.id = id
+        self.role = intern(role)
+        self.name = intern(name)
+        self.content_type = intern(content_type)
+        self.parts = parts
+        self.create_time = create_time
+        self.status = intern(status)
+        self.end_turn = end_turn
+        self.weight = weight
+        self.is_user_system_message = is_user_system_message
+        self.user_context_message_data = user_context_message_data
+        self.finish_details = finish_details
+        self.timestamp = intern(timestamp)
+        self.message_type = intern(message_type)
+        self.model_slug = intern(model_slug)
+        self.parent_id = parent_id
+
+    def values(self):
+        """
+        Return the field values in MESSAGE_FIELDS order.
+        """
+        return tuple(getattr(self, field) for field in MESSAGE_FIELDS)
+
+    def __repr__(self):
+        return f"Message(id={self.id!r}, role={self.role!r}, parts={len(self.parts)})"
+
+
+class Conversation:
+    """
+    A conversation with its messages in thread order.
+
+    `messages` follows the root to the current node. `branches`, when requested,
+    lists the messages of every root-to-leaf path, and is None otherwise.
+    """
+
+    __slots__ = ("id", "title", "create_time", "update_time", "messages", "branches")
+
+    def __init__(self, id, title, create_time, update_time, messages, branches=None):
+        self.id = id
+        self.title = title
+        self.create_time = create_time
+        self.update_time = update_time
+        self.messages = messages
+        self.branches = branches
+
+    def __repr__(self):
+        return f"Conversation(id={self.id!r}, title={self.title!r}, messages={len(self.messages)})"
@@ -0,0 +1,157 @@
+"""
+Write per-conversation Markdown files.
+
+File names are a slug of the title plus a short form of the conversation id, such as
+`python-decorators-1a2b3c4d.md`, so they are readable, stable between runs and
+distinct for conversations that share a title. FilenameAllocator resolves the rare
+remaining collisions deterministically.
+
+OutputWriter writes the files on a bounded thread pool, each through a temporary
+file and a rename, so several writes are in flight at once. That keeps a disk busy
+on networked storage, where the latency of each file dominates.
+"""
+
+import logging
+import os
+import re
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from gptc.manifest import atomic_write_text
+
+DEFAULT_WRITE_THREADS = 8
+SLUG_LENGTH = 60
+SHORT_ID_LENGTH = 8
+
+_NOT_SLUG = re.compile(r"[^\w]+")
+
+
+def slugify(title, max_length=SLUG_LENGTH):
+    """
+    Return a lowercase, filesystem-safe slug of a title, or "untitled".
+    """
+    text = unicodedata.normalize("NFKC", str(title or "")).lower()
+    slug = _NOT_SLUG.sub("-", text).strip("-_")[:max_length].rstrip("-_")
+    return slug or "untitled"
+
+
+def conversation_filename(title, conversation_id=None, index=0, id_length=SHORT_ID_LENGTH):
+    """
+    Return the preferred file name of a conversation: its title slug and the first
+    id_length characters of its id, or its 1-based position when it has no id.
+    """
+    if conversation_id:
+        short_id = _NOT_SLUG.sub("", str(conversation_id))[:id_length]
+        return f"{slugify(title)}-{short_id}.md"
+    return f"{slugify(title)}-{index + 1}.md"
+
+
+class FilenameAllocator:
+    """
+    Hand out file names that are unique within an output directory.
+
+    `reserved` maps names already in use (for example from a manifest) to the
+    conversation that owns them; a conversation may take back its own name. A name
+    handed out in this run is never handed out again, even to a conversation with
+    the same id. When the preferred name is taken, more of the id is used, and as a
+    last resort a counter is appended. Given the same input order the result is
+    always the same.
+
+    A conversation without an id is owned by its manifest key, which changes with its
+    content. `reclaimable(name)` tells whether such a conversation may take over its
+    preferred name from the previous version it was written as.
+    """
+
+    def __init__(self, reserved=None, reclaimable=None):
+        self.owners = dict(reserved or {})
+        self.allocated = set()
+        self.reclaimable = reclaimable
+
+    def _free(self, name, owner):
+        return name not in self.allocated and self.owners.get(name, owner) == owner
+
+    def allocate(self, title, conversation_id=None, index=0, owner=None):
+        """
+        Return the file name of a conversation. owner identifies the conversation in
+        `reserved`, and defaults to its id or, without one, its index.
+        """
+        owner = owner or conversation_id or f"#{index}"
+        candidates = [conversation_filename(title, conversation_id, index)]
+        if conversation_id:
+            candidates.append(conversation_filename(title, conversation_id, index, id_length=None))
+        elif (self.reclaimable is not None and candidates[0] not in self.allocated
+              and self.reclaimable(candidates[0])):
+            self.owners[candidates[0]] = owner
+        name = next((name for name in candidates if self._free(name, owner)), None)
+        if name is None:
+            stem = candidates[-1][:-len(".md")]
+            number = 2
+            while not self._free(f"{stem}-{number}.md", owner):
+                number += 1
+            name = f"{stem}-{number}.md"
+        self.owners[name] = owner
+        self.allocated.add(name)
+        return name
+
+
+class OutputWriter:
+    """
+    Write text files under output_dir on a pool of `threads` threads.
+
+    At most `threads * 4` writes are queued at a time, so rendering cannot run away
+    from a slow disk. Completion callbacks run on the calling thread, in submission
+    order, once their file is in place. Failed writes are logged and counted in
+    `failures`.
+    """
+
+    def __init__(self, output_dir, threads=DEFAULT_WRITE_THREADS):
+        self.output_dir = output_dir
+        self.max_pending = threads * 4
+        self.failures = 0
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="gptc-write")
+        self._pending = deque()
+        self._directories = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _ensure_directory(self, directory):
+        # Each directory is created once per run instead of once per file.
+        if directory not in self._directories:
+            os.makedirs(directory, exist_ok=True)
+            self._directories.add(directory)
+
+    def write(self, relative_path, text, on_done=None):
+        """
+        Queue an atomic write of text to relative_path, calling on_done() once the
+        file has been written.
+        """
+        path = os.path.join(self.output_dir, relative_path)
+        self._ensure_directory(os.path.dirname(path) or ".")
+        while len(self._pending) >= self.max_pending:
+            self._finish(self._pending.popleft())
+        future = self._executor.submit(atomic_write_text, path, text)
+        self._pending.append((future, path, on_done))
+
+    def _finish(self, pending):
+        future, path, on_done = pending
+        try:
+            future.result()
+        except Exception as e:
+            self.failures += 1
+            logging.error(f"Failed to write {path}: {e}")
+            return
+        if on_done is not None:
+            on_done()
+
+    def close(self):
+        """
+        Wait for every queued write to finish.
+        """
+        while self._pending:
+            self._finish(self._pending.popleft())
+        self._executor.shutdown()
@@ -0,0 +1,215 @@
+"""
+Convert conversations on a process pool.
+
+The parent process streams raw conversation bytes out of the export and sends them
+to the workers in batches. Workers decode, linearize and render each conversation;
+the parent writes the results, per-file output through the same thread-pooled
+writer as the serial pipeline. Results come back in input order, and at most
+`jobs * 2` batches are in flight, so memory stays bounded however large the export is.
+"""
+
+import json
+import logging
+import os
+import time
+from functools import partial
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from gptc.conversation_tree import linearize_conversation
+from gptc.instrumentation import RunStats
+from gptc.main import close_manifest, configure_conversion, open_manifest
+from gptc.manifest import content_hash
+from gptc.output_writer import FilenameAllocator, OutputWriter
+from gptc.search_index import message_rows
+from gptc.stream_reader import iter_raw_conversations
+from gptc.volumes import VolumeWriter
+
+_plan = None
+_index_rows = False
+
+
+def _init_worker(config_file, index_rows):
+    global _plan, _index_rows
+    _plan = configure_conversion(config_file)
+    _index_rows = index_rows
+
+
+def _convert_batch(batch):
+    """
+    Render a batch of (index, raw JSON, digest) tuples.
+
+    Returns (index, markdown, error, staged, indexed, message count) tuples, where the
+    message count is None if the conversation failed before it was linearized. Markdown
+    is the rendered (conversation id, title, text) and staged is (conversation id,
+    update time, digest) for the manifest. error is a message describing why the
+    conversation failed. indexed holds (id, title, update time, search rows) when
+    indexing is on, since only the parent process writes to the search database.
+
+    The results come with the seconds the batch spent in each stage.
+    """
+    results = []
+    times = dict.fromkeys(("load", "extract", "render"), 0.0)
+    clock = time.perf_counter
+    for index, raw, digest in batch:
+        messages = None
+        try:
+            t0 = clock()
+            conversation = json.loads(raw)
+            t1 = clock()
+            thread = linearize_conversation(conversation)
+            messages = len(thread.messages)
+            extracted = _plan.extract(thread)
+            t2 = clock()
+            markdown = (thread.id, thread.title, _plan.render(extracted))
+            t3 = clock()
+            indexed = None
+            if _index_rows:
+                indexed = (thread.id, thread.title, thread.update_time, message_rows(thread))
+            staged = (thread.id, thread.update_time, digest)
+            times["load"] += t1 - t0
+            times["extract"] += t2 - t1
+            times["render"] += t3 - t2
+            results.append((index, markdown, None, staged, indexed, messages))
+        except Exception as e:
+            results.append((index, None, f"{type(e).__name__}: {e}", None, None, messages))
+    return results, times
+
+
+def _batches(raw_conversations, batch_size):
+    raw_conversations = iter(raw_conversations)
+    while True:
+        batch = list(islice(raw_conversations, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _changed(raw_conversations, manifest, stats, is_current=None, file_path=None):
+    """
+    Yield (position, raw JSON, digest) for the raw conversations, dropping those the
+    manifest has seen.
+
+    An export that cannot be read to the end is logged and counted in errors; the
+    conversations read up to that point are still converted, but the manifest is not
+    marked complete, so nothing is pruned.
+    """
+    try:
+        for position, raw in enumerate(raw_conversations):
+            stats.count("bytes", len(raw))
+            if manifest is None:
+                yield position, raw, None
+                continue
+            digest = content_hash(raw)
+            if manifest.unchanged(digest, is_current):
+                stats.count("unchanged")
+            else:
+                yield position, raw, digest
+        if manifest is not None:
+            manifest.complete = True
+    except ValueError as e:
+        stats.count("errors")
+        logging.error(f"Failed to decode JSON from {file_path}: {e}")
+    except OSError as e:
+        stats.count("errors")
+        logging.error(f"An error occurred while loading the JSON file: {e}")
+
+
+def iter_parallel_results(raw_conversations, config_file, jobs, batch_size=16,
+                          index_rows=False, stats=None):
+    """
+    Yield the _convert_batch result for every (index, raw JSON, digest) tuple, in input
+    order.
+
+    Worker stage times are added to stats as "worker <stage>"; they are summed over
+    all workers, so they can exceed the wall-clock time of the run.
+    """
+    def collect(future):
+        results, times = future.result()
+        if stats is not None:
+            for stage, seconds in times.items():
+                stats.add_time(f"worker {stage}", seconds)
+        return results
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(config_file, index_rows)) as executor:
+        pending = deque()
+        for batch in _batches(raw_conversations, batch_size):
+            pending.append(executor.submit(_convert_batch, batch))
+            if len(pending) >= jobs * 2:
+                yield from collect(pending.popleft())
+        while pending:
+            yield from collect(pending.popleft())
+
+
+def convert_parallel(json_file_path, config_file_path, output_path, jobs, batch_size=16,
+                     incremental=False, prune=False, search_index=None, stats=None,
+                     conversation_filter=None):
+    """
+    Convert an export with `jobs` worker processes. Conversations rejected by
+    conversation_filter are dropped by the reader before they reach the workers,
+    which means the reader has to decode every conversation; without a filter it
+    only finds where each one ends.
+
+    Per-conversation failures are logged and skipped instead of aborting the run.
+    Returns the number of conversations that failed.
+    """
+    plan = configure_conversion(config_file_path)
+    single_file_output = plan.single_file_output
+    stats = stats or RunStats()
+    if not os.path.isfile(json_file_path):
+        logging.error(f"File {json_file_path} not found.")
+        stats.count("errors")
+        return 0
+    logging.info(f"Converting with {jobs} worker processes.")
+
+    manifest = open_manifest(plan, output_path, incremental)
+
+    failures = 0
+    is_current = search_index.is_current if search_index is not None else None
+    raw_conversations = iter_raw_conversations(json_file_path, select=conversation_filter)
+    raw_conversations = stats.stage("read", _changed(raw_conversations, manifest, stats, is_current,
+                                                     json_file_path))
+    results = iter_parallel_results(raw_conversations, config_file_path, jobs, batch_size,
+                                    index_rows=search_index is not None, stats=stats)
+    if single_file_output:
+        writer = VolumeWriter(output_path, plan.volume_size)
+    else:
+        writer = OutputWriter(output_path)
+        allocator = (FilenameAllocator(manifest.paths(), manifest.reclaimable)
+                     if manifest is not None else FilenameAllocator())
+    try:
+        with stats.sink("merge"):
+            for index, markdown, error, staged, indexed, messages in results:
+                stats.count("conversations")
+                if messages is not None:
+                    stats.count("messages", messages)
+                if error is not None:
+                    failures += 1
+                    stats.count("failed")
+                    logging.error(f"Conversation {index + 1} failed: {error}")
+                    continue
+                if indexed is not None:
+                    search_index.add_rows(*indexed)
+                if single_file_output:
+                    writer.write(*markdown)
+                    continue
+                conversation_id, title, markdown_text = markdown
+                key = manifest.stage(*staged) if manifest is not None else None
+                filename = allocator.allocate(title, conversation_id, index, key)
+                on_done = None
+                if manifest is not None:
+                    on_done = partial(manifest.record, key, filename)
+                writer.write(filename, markdown_text, on_done)
+    finally:
+        writer.close()
+        if not single_file_output:
+            failures += writer.failures
+            if writer.failures:
+                stats.count("failed", writer.failures)
+        if manifest is not None and failures:
+            # Failed conversations were not seen, so their old output must not be pruned.
+            manifest.complete = False
+        close_manifest(manifest, prune)
+    return failures
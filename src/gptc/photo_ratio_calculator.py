@@ -1,6 +1,6 @@
-from rich.console import Console
-from rich.table import Table
-import math
+from typing import NamedTuple
+
+import numpy as np
 
 def sdxl_ratio_simple() -> None:
     """Display SDXL ratio catalogue as a table with headings height, width, 
@@ -15,6 +15,9 @@ def sdxl_ratio_simple() -> None:
         1536 x 640 (12:5 Horizontal)
         640 x 1536 (5:12 Vertical, the closest to the iPhone resolution)
     """
+    from rich.console import Console
+    from rich.table import Table
+
     console = Console()
     table = Table(title="SDXL Ratio Catalogue")
     table.add_column("Height", justify="right", style="cyan")
@@ -32,117 +35,129 @@ def sdxl_ratio_simple() -> None:
     table.add_row("640", "1536", "5:12", "Vertical, the closest to the iPhone resolution")
     console.print(table)
     return None
-    
-    
-from rich.console import Console
-from rich.table import Table
+
+
+# SDXL training resolutions as (width, height): the base resolution, then widescreen, then portrait.
+SDXL_RESOLUTIONS = (
+    (1024, 1024),
+    (2048, 512), (1984, 512), (1920, 512), (1856, 512), (1792, 576), (1728, 576),
+    (1664, 576), (1600, 640), (1536, 640), (1472, 704), (1408, 704), (1344, 704),
+    (1344, 768), (1280, 768), (1216, 832), (1152, 832), (1152, 896), (1088, 896),
+    (1088, 960), (1024, 960),
+    (960, 1024), (960, 1088), (896, 1088), (896, 1152), (832, 1152), (832, 1216),
+    (768, 1280), (768, 1344), (704, 1408), (704, 1472), (640, 1536), (640, 1600),
+    (576, 1664), (576, 1728), (576, 1792), (512, 1856), (512, 1920), (512, 1984),
+    (512, 2048),
+)
+
+
+class BucketTable(NamedTuple):
+    """The SDXL resolutions as arrays, with their reduced ratios, log-aspects and pixel counts"""
+    width: np.ndarray
+    height: np.ndarray
+    ratio_width: np.ndarray
+    ratio_height: np.ndarray
+    log_aspect: np.ndarray
+    pixels: np.ndarray
+    # Indices of the buckets in increasing log-aspect order, for np.searchsorted
+    order: np.ndarray
+
+
+class BucketAssignment(NamedTuple):
+    """Per-image arrays: the nearest bucket, and how to scale and centre-crop the image into it"""
+    bucket: np.ndarray
+    width: np.ndarray
+    height: np.ndarray
+    scale: np.ndarray
+    resized_width: np.ndarray
+    resized_height: np.ndarray
+    crop_left: np.ndarray
+    crop_top: np.ndarray
+
+
+def build_bucket_table(resolutions=SDXL_RESOLUTIONS) -> BucketTable:
+    """Compute the ratios, log-aspects and pixel counts of a list of (width, height) resolutions."""
+    sizes = np.array(resolutions, dtype=np.int64)
+    width, height = sizes[:, 0], sizes[:, 1]
+    divisor = np.gcd(width, height)
+    log_aspect = np.log(width / height)
+    return BucketTable(width, height, width // divisor, height // divisor, log_aspect,
+                       width * height, np.argsort(log_aspect, kind="stable"))
+
+
+_bucket_table = None
+
+
+def bucket_table() -> BucketTable:
+    """Return the SDXL bucket table, computed on first use."""
+    global _bucket_table
+    if _bucket_table is None:
+        _bucket_table = build_bucket_table()
+    return _bucket_table
+
+
+def assign_buckets(widths, heights, table=None) -> BucketAssignment:
+    """Assign images to the bucket with the closest aspect ratio.
+
+    widths and heights are equally shaped arrays (or sequences) of positive image
+    sizes. Each image is scaled by the smallest factor that makes it cover its
+    bucket, and the overhang is cropped equally from both sides. Ties between two
+    buckets go to the one with the smaller aspect ratio.
+    """
+    table = table if table is not None else bucket_table()
+    widths = np.asarray(widths, dtype=np.int64)
+    heights = np.asarray(heights, dtype=np.int64)
+    if widths.shape != heights.shape:
+        raise ValueError("widths and heights must have the same shape.")
+    if widths.size and (widths.min() <= 0 or heights.min() <= 0):
+        raise ValueError("Image sizes must be positive.")
+
+    # Binary search in the sorted log-aspects, then pick the nearer neighbour.
+    log_aspect = np.log(widths / heights)
+    sorted_aspects = table.log_aspect[table.order]
+    upper = np.clip(np.searchsorted(sorted_aspects, log_aspect), 1, len(sorted_aspects) - 1)
+    lower = upper - 1
+    take_upper = np.abs(sorted_aspects[upper] - log_aspect) < np.abs(log_aspect - sorted_aspects[lower])
+    bucket = table.order[np.where(take_upper, upper, lower)]
+
+    bucket_width = table.width[bucket]
+    bucket_height = table.height[bucket]
+    scale = np.maximum(bucket_width / widths, bucket_height / heights)
+    # Rounding may land a pixel short of the bucket; the cover scale never is.
+    resized_width = np.maximum(np.rint(widths * scale).astype(np.int64), bucket_width)
+    resized_height = np.maximum(np.rint(heights * scale).astype(np.int64), bucket_height)
+    return BucketAssignment(bucket, bucket_width, bucket_height, scale, resized_width, resized_height,
+                            (resized_width - bucket_width) // 2, (resized_height - bucket_height) // 2)
+
+
+def nearest_bucket(width: int, height: int) -> tuple:
+    """Return the (width, height) of the SDXL bucket closest to one image size."""
+    assignment = assign_buckets([width], [height])
+    return int(assignment.width[0]), int(assignment.height[0])
+
 
 def sdxl_ratio_complete() -> None:
-    """resolutions = [
-        # SDXL Base resolution
-        {"width": 1024, "height": 1024},
-        # SDXL Resolutions, widescreen
-        {"width": 2048, "height": 512},
-        {"width": 1984, "height": 512},
-        {"width": 1920, "height": 512},
-        {"width": 1856, "height": 512},
-        {"width": 1792, "height": 576},
-        {"width": 1728, "height": 576},
-        {"width": 1664, "height": 576},
-        {"width": 1600, "height": 640},
-        {"width": 1536, "height": 640},
-        {"width": 1472, "height": 704},
-        {"width": 1408, "height": 704},
-        {"width": 1344, "height": 704},
-        {"width": 1344, "height": 768},
-        {"width": 1280, "height": 768},
-        {"width": 1216, "height": 832},
-        {"width": 1152, "height": 832},
-        {"width": 1152, "height": 896},
-        {"width": 1088, "height": 896},
-        {"width": 1088, "height": 960},
-        {"width": 1024, "height": 960},
-        # SDXL Resolutions, portrait
-        {"width": 960, "height": 1024},
-        {"width": 960, "height": 1088},
-        {"width": 896, "height": 1088},
-        {"width": 896, "height": 1152},
-        {"width": 832, "height": 1152},
-        {"width": 832, "height": 1216},
-        {"width": 768, "height": 1280},
-        {"width": 768, "height": 1344},
-        {"width": 704, "height": 1408},
-        {"width": 704, "height": 1472},
-        {"width": 640, "height": 1536},
-        {"width": 640, "height": 1600},
-        {"width": 576, "height": 1664},
-        {"width": 576, "height": 1728},
-        {"width": 576, "height": 1792},
-        {"width": 512, "height": 1856},
-        {"width": 512, "height": 1920},
-        {"width": 512, "height": 1984},
-        {"width": 512, "height": 2048},
-    ]    """
-
-    resolutions = [
-        {"width": 1024, "height": 1024}, # SDXL Base resolution
-        {"width": 2048, "height": 512},  # SDXL Resolutions, widescreen
-        {"width": 1984, "height": 512},
-        {"width": 1920, "height": 512},
-        {"width": 1856, "height": 512},
-        {"width": 1792, "height": 576},
-        {"width": 1728, "height": 576},
-        {"width": 1664, "height": 576},
-        {"width": 1600, "height": 640},
-        {"width": 1536, "height": 640},
-        {"width": 1472, "height": 704},
-        {"width": 1408, "height": 704},
-        {"width": 1344, "height": 704},
-        {"width": 1344, "height": 768},
-        {"width": 1280, "height": 768},
-        {"width": 1216, "height": 832},
-        {"width": 1152, "height": 832},
-        {"width": 1152, "height": 896},
-        {"width": 1088, "height": 896},
-        {"width": 1088, "height": 960},
-        {"width": 1024, "height": 960},
-        {"width": 960, "height": 1024},  # SDXL Resolutions, portrait
-        {"width": 960, "height": 1088},
-        {"width": 896, "height": 1088},
-        {"width": 896, "height": 1152},
-        {"width": 832, "height": 1152},
-        {"width": 832, "height": 1216},
-        {"width": 768, "height": 1280},
-        {"width": 768, "height": 1344},
-        {"width": 704, "height": 1408},
-        {"width": 704, "height": 1472},
-        {"width": 640, "height": 1536},
-        {"width": 640, "height": 1600},
-        {"width": 576, "height": 1664},
-        {"width": 576, "height": 1728},
-        {"width": 576, "height": 1792},
-        {"width": 512, "height": 1856},
-        {"width": 512, "height": 1920},
-        {"width": 512, "height": 1984},
-        {"width": 512, "height": 2048}
-    ]
+    """Display every SDXL training resolution with its reduced ratio."""
+    from rich.console import Console
+    from rich.table import Table
 
+    table_data = bucket_table()
     console = Console()
     table = Table(title="SDXL Ratio Catalogue")
     table.add_column("Width", justify="right", style="cyan")
     table.add_column("Height", justify="right", style="cyan")
     table.add_column("Ratio", justify="right", style="magenta")
-    for resolution in resolutions:
-        width = str(resolution["width"])
-        height = str(resolution["height"])
-        ratio = f"{resolution['width'] // math.gcd(resolution['width'], resolution['height'])}:" \
-            f"{resolution['height'] // math.gcd(resolution['width'], resolution['height'])}"
-        table.add_row(width, height, ratio)
+    for width, height, ratio_width, ratio_height in zip(table_data.width, table_data.height,
+                                                        table_data.ratio_width, table_data.ratio_height):
+        table.add_row(str(width), str(height), f"{ratio_width}:{ratio_height}")
     console.print(table)
     return None
 
 
 def main_menu() -> None:
+    from rich.console import Console
+    from rich.table import Table
+
     console = Console()
     table = Table(show_header=True, header_style="bold magenta")
     table.add_column("Option")
@@ -0,0 +1,234 @@
+"""
+Compile the conversion settings from config.toml into a render plan.
+
+The plan is a fixed tuple of (extractor, formatter) pairs for the enabled fields,
+so rendering a message never looks at the configuration or at disabled fields.
+"""
+
+import difflib
+import hashlib
+from datetime import datetime, timezone
+from operator import attrgetter
+
+from gptc.markdown_normalize import normalize_markdown
+
+DEFAULT_CONFIG = {
+    "single_file_output": True,
+    "volume_size_mb": 0,
+    "normalize_markdown": False,
+    "include_title": True,
+    "include_create_time": True,
+    "include_update_time": False,
+    "message": {
+        "include_author_role": True,
+        "include_author_name": False,
+        "include_content_type": True,
+        "include_parts": True,
+        "include_status": False,
+        "include_end_turn": False,
+        "include_weight": False
+    },
+    "metadata": {
+        "include_is_user_system_message": False,
+        "include_user_context_message_data": False,
+        "include_finish_details": False,
+        "include_timestamp": False,
+        "include_message_type": False,
+        "include_model_slug": False,
+        "include_parent_id": False
+    }
+}
+
+
+class ConfigError(ValueError):
+    """Raised when a configuration contains unknown keys or values of the wrong type."""
+
+
+def format_time(value):
+    """
+    Format an export timestamp (seconds since the epoch) for display.
+    """
+    if value is None:
+        return "Unknown"
+    return datetime.fromtimestamp(value, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+
+def _line(template, convert=str):
+    """Return a formatter that renders a value into a Markdown line."""
+    def formatter(value):
+        return template.format(convert(value))
+    return formatter
+
+
+# Conversation-level fields: config key -> (Conversation attribute, formatter).
+CONVERSATION_FIELDS = {
+    "include_title": ("title", _line("# {}\n\n", lambda value: value or "Untitled")),
+    "include_create_time": ("create_time", _line("**Created**: {}\n\n", format_time)),
+    "include_update_time": ("update_time", _line("**Updated**: {}\n\n", format_time)),
+}
+
+# Optional per-message fields, in render order: (config table, config key) -> (Message attribute, formatter).
+MESSAGE_FIELDS = {
+    ("message", "include_author_name"): ("name", _line("**Author name**: {}\n\n")),
+    ("message", "include_content_type"): ("content_type", _line("**Content type**: {}\n\n")),
+    ("message", "include_status"): ("status", _line("**Status**: {}\n\n")),
+    ("message", "include_end_turn"): ("end_turn", _line("**End turn**: {}\n\n")),
+    ("message", "include_weight"): ("weight", _line("**Weight**: {}\n\n")),
+    ("metadata", "include_is_user_system_message"): (
+        "is_user_system_message", _line("**User system message**: {}\n\n")),
+    ("metadata", "include_user_context_message_data"): (
+        "user_context_message_data", _line("**User context**: {}\n\n")),
+    ("metadata", "include_finish_details"): ("finish_details", _line("**Finish details**: {}\n\n")),
+    ("metadata", "include_timestamp"): ("timestamp", _line("**Timestamp**: {}\n\n")),
+    ("metadata", "include_message_type"): ("message_type", _line("**Message type**: {}\n\n")),
+    ("metadata", "include_model_slug"): ("model_slug", _line("**Model**: {}\n\n")),
+    ("metadata", "include_parent_id"): ("parent_id", _line("**Parent**: {}\n\n")),
+}
+
+_format_role = _line("## {}\n\n", lambda role: (role or "Unknown").capitalize())
+
+
+def _unknown_key(key, known, table=None):
+    where = f"[{table}] " if table else ""
+    suggestion = difflib.get_close_matches(key, known, n=1)
+    hint = f" Did you mean '{suggestion[0]}'?" if suggestion else ""
+    return ConfigError(f"Unknown configuration key {where}'{key}'.{hint}")
+
+
+def merge_config(user_config):
+    """
+    Validate a user configuration against DEFAULT_CONFIG and return the merged result.
+
+    Unknown or misspelled keys and values of the wrong type raise ConfigError, so a
+    typo fails at load time instead of silently dropping a field from the output.
+    """
+    merged = {}
+    for key, value in DEFAULT_CONFIG.items():
+        merged[key] = dict(value) if isinstance(value, dict) else value
+
+    for key, value in user_config.items():
+        if key not in DEFAULT_CONFIG:
+            raise _unknown_key(key, DEFAULT_CONFIG)
+        default = DEFAULT_CONFIG[key]
+        if isinstance(default, dict):
+            if not isinstance(value, dict):
+                raise ConfigError(f"Configuration key '{key}' must be a table.")
+            for sub_key, sub_value in value.items():
+                if sub_key not in default:
+                    raise _unknown_key(sub_key, default, table=key)
+                if not isinstance(sub_value, bool):
+                    raise ConfigError(f"Configuration key [{key}] '{sub_key}' must be true or false.")
+                merged[key][sub_key] = sub_value
+        elif isinstance(default, bool):
+            if not isinstance(value, bool):
+                raise ConfigError(f"Configuration key '{key}' must be true or false.")
+            merged[key] = value
+        else:
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise ConfigError(f"Configuration key '{key}' must be a whole number, 0 or more.")
+            merged[key] = value
+    return merged
+
+
+class RenderPlan:
+    """
+    The enabled fields of a configuration, compiled into extractor/formatter pairs.
+    """
+
+    __slots__ = ("single_file_output", "volume_size", "conversation_fields", "message_fields",
+                 "role_field", "include_parts", "normalize", "fingerprint")
+
+    def __init__(self, config, fingerprint="default"):
+        # Identifies the configuration, so output rendered with another one is detectable.
+        self.fingerprint = fingerprint
+        self.single_file_output = config["single_file_output"]
+        # Largest size of one single-file output volume in bytes; 0 means unlimited.
+        self.volume_size = config["volume_size_mb"] << 20
+        self.conversation_fields = tuple(
+            (attrgetter(attribute), formatter)
+            for config_key, (attribute, formatter) in CONVERSATION_FIELDS.items()
+            if config[config_key]
+        )
+        self.message_fields = tuple(
+            (attrgetter(attribute), formatter)
+            for (table, config_key), (attribute, formatter) in MESSAGE_FIELDS.items()
+            if config[table][config_key]
+        )
+        self.role_field = attrgetter("role") if config["message"]["include_author_role"] else None
+        self.include_parts = config["message"]["include_parts"]
+        self.normalize = config["normalize_markdown"]
+
+    def extract(self, thread):
+        """
+        Reduce a linearized Conversation to the values of the enabled fields.
+
+        Returns (conversation values, message tuples), where each message tuple is
+        (role, field values, text parts).
+        """
+        header = tuple(get(thread) for get, _ in self.conversation_fields)
+        role_field = self.role_field
+        include_parts = self.include_parts
+        messages = []
+        for record in thread.messages:
+            parts = ()
+            if include_parts:
+                parts = tuple(str(part) for part in record.parts if part)
+                if not parts:
+                    # Hidden system prompts and placeholders carry no text.
+                    continue
+            messages.append((
+                role_field(record) if role_field else None,
+                tuple(get(record) for get, _ in self.message_fields),
+                parts,
+            ))
+        return header, messages
+
+    def render(self, extracted):
+        """
+        Render the output of extract() as Markdown.
+        """
+        header, messages = extracted
+        lines = [fmt(value) for (_, fmt), value in zip(self.conversation_fields, header)]
+        role_field = self.role_field
+        for role, values, parts in messages:
+            if role_field:
+                lines.append(_format_role(role))
+            lines.extend(fmt(value) for (_, fmt), value in zip(self.message_fields, values))
+            lines.extend(f"{part}\n\n" for part in parts)
+        if self.normalize:
+            return normalize_markdown("".join(lines))
+        return "".join(lines)
+
+
+_plan_cache = {}
+
+
+def load_plan(config_file=None):
+    """
+    Return the compiled RenderPlan for a config file, or for the defaults if None.
+
+    Plans are cached by the SHA-256 of the file contents, so repeated loads of an
+    unchanged file reuse the compiled plan. A file that cannot be read or parsed
+    raises ConfigError, like one with unknown keys.
+    """
+    if config_file is None:
+        key = None
+        if key not in _plan_cache:
+            _plan_cache[key] = RenderPlan(merge_config({}))
+        return _plan_cache[key]
+
+    try:
+        with open(config_file, "rb") as f:
+            raw = f.read()
+    except OSError as e:
+        raise ConfigError(f"Cannot read configuration file {config_file}: {e.strerror or e}.") from e
+    key = hashlib.sha256(raw).hexdigest()
+    plan = _plan_cache.get(key)
+    if plan is None:
+        import toml
+        try:
+            user_config = toml.loads(raw.decode("utf-8"))
+        except (toml.TomlDecodeError, UnicodeDecodeError) as e:
+            raise ConfigError(f"Invalid configuration file {config_file}: {e}") from e
+        plan = _plan_cache[key] = RenderPlan(merge_config(user_config), key)
+    return plan
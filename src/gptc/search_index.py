@@ -0,0 +1,173 @@
+"""
+A local SQLite FTS5 full-text index of converted messages.
+
+Messages of one conversation are inserted as a contiguous block of rowids, and the
+block is recorded next to the conversation's `update_time`. Re-indexing a changed
+conversation deletes that rowid range, so updates never scan the whole index.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+from urllib.request import pathname2url
+
+DEFAULT_INDEX_PATH = "gptc_search.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    update_time REAL,
+    first_row INTEGER,
+    last_row INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(
+    text,
+    title,
+    conversation_id UNINDEXED,
+    role UNINDEXED,
+    timestamp UNINDEXED,
+    model_slug UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Words FTS5 accepts unquoted, optionally with a column filter, an initial-token
+# marker or a prefix star, and its operators.
+_BAREWORD = r"[\w\x80-\U0010ffff]+"
+_PLAIN_TERM = re.compile(rf"(?:{_BAREWORD}:)?\^?{_BAREWORD}\*?")
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def _fts_term(term):
+    core = term.lstrip("(")
+    opening = term[:len(term) - len(core)]
+    stripped = core.rstrip(")")
+    closing = core[len(stripped):]
+    core = stripped
+    if (not core or core in _OPERATORS or core.startswith("NEAR(") or '"' in core
+            or _PLAIN_TERM.fullmatch(core)):
+        return term
+    star = "*" if core.endswith("*") and core != "*" else ""
+    return f'{opening}"{core[:len(core) - len(star)]}"{star}{closing}'
+
+
+def fts_query(text):
+    """
+    Turn search text into an FTS5 query. Words that FTS5 would reject unquoted, such
+    as `gpt-4` or `c++`, are searched as phrases, keeping a trailing `*` as a prefix
+    query; operators, grouping, prefix queries, column filters and quoted phrases
+    are passed through.
+    """
+    return " ".join(_fts_term(term) for term in text.split())
+
+
+def message_rows(thread):
+    """
+    Return the (text, role, timestamp, model slug) rows of a linearized conversation,
+    skipping messages without any text.
+    """
+    rows = []
+    for record in thread.messages:
+        text = "\n".join(str(part) for part in record.parts if part)
+        if text:
+            rows.append((text, record.role, record.create_time, record.model_slug))
+    return rows
+
+
+class SearchIndex:
+    """
+    Full-text index of the messages of every converted conversation.
+
+    With read_only, an existing index is opened for searching only; a missing one
+    raises sqlite3.OperationalError instead of being created.
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH, read_only=False):
+        self.db_path = db_path
+        self.read_only = read_only
+        if read_only:
+            uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+            self.connection = sqlite3.connect(uri, uri=True)
+        else:
+            self.connection = sqlite3.connect(db_path)
+            self.connection.executescript(_SCHEMA)
+        self.indexed = 0
+        self.skipped = 0
+
+    def is_current(self, conversation_id, update_time):
+        """
+        Return True if the conversation is already indexed at this update_time.
+        """
+        row = self.connection.execute(
+            "SELECT update_time FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return row is not None and row[0] == update_time
+
+    def add_rows(self, conversation_id, title, update_time, rows):
+        """
+        Index the message rows of a conversation, replacing any older version.
+        Conversations that are already current are left alone.
+        """
+        if self.is_current(conversation_id, update_time):
+            self.skipped += 1
+            return
+        self._replace(conversation_id, title, update_time, rows)
+
+    def add(self, thread):
+        """
+        Index a linearized conversation.
+        """
+        if self.is_current(thread.id, thread.update_time):
+            self.skipped += 1
+            return
+        self._replace(thread.id, thread.title, thread.update_time, message_rows(thread))
+
+    def _replace(self, conversation_id, title, update_time, rows):
+        cursor = self.connection.cursor()
+        previous = cursor.execute(
+            "SELECT first_row, last_row FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        if previous is not None and previous[0] is not None:
+            cursor.execute("DELETE FROM messages WHERE rowid BETWEEN ? AND ?", previous)
+
+        first_row = last_row = None
+        if rows:
+            last = cursor.execute("SELECT rowid FROM messages ORDER BY rowid DESC LIMIT 1").fetchone()
+            first_row = (last[0] if last else 0) + 1
+            last_row = first_row + len(rows) - 1
+            cursor.executemany(
+                "INSERT INTO messages (rowid, text, title, conversation_id, role, timestamp, model_slug)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (rowid, text, title, conversation_id, role, timestamp, model_slug)
+                    for rowid, (text, role, timestamp, model_slug) in enumerate(rows, first_row)
+                ),
+            )
+        cursor.execute(
+            "INSERT OR REPLACE INTO conversations (id, title, update_time, first_row, last_row)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (conversation_id, title, update_time, first_row, last_row),
+        )
+        self.indexed += 1
+
+    def search(self, query, limit=20):
+        """
+        Return the best matches for an FTS5 query as (title, role, timestamp, model slug,
+        conversation id, snippet) tuples, most relevant first.
+        """
+        return self.connection.execute(
+            "SELECT title, role, timestamp, model_slug, conversation_id,"
+            " snippet(messages, 0, '[', ']', ' ... ', 16)"
+            " FROM messages WHERE messages MATCH ? ORDER BY bm25(messages, 1.0, 4.0) LIMIT ?",
+            (query, limit),
+        ).fetchall()
+
+    def close(self):
+        if self.read_only:
+            self.connection.close()
+            return
+        self.connection.commit()
+        self.connection.close()
+        logging.info(f"Search index: {self.indexed} indexed, {self.skipped} unchanged.")
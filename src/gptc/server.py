@@ -0,0 +1,248 @@
+"""
+Serve the conversations of an export over HTTP on localhost.
+
+`gptc serve` lists the conversations of an export cache and renders one only when
+it is requested: Markdown with the same render plan as `gptc convert`, and HTML
+from that Markdown. Rendering runs on a process pool, so a large conversation
+never holds up other requests, and concurrent requests for the same conversation
+share one render. Rendered pages are kept in a size-bounded LRUCache. Every page
+has an ETag made of the conversation's content hash and the render configuration,
+so a browser revalidating with If-None-Match gets 304 Not Modified without
+anything being rendered.
+
+Routes:
+
+    /               the list of conversations
+    /c/<key>        a conversation as HTML
+    /c/<key>.md     a conversation as Markdown
+"""
+
+import asyncio
+import html
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import quote, unquote, urlsplit
+
+from gptc.browse import LRUCache
+from gptc.export_cache import ExportCache, ingest, is_export_cache
+from gptc.main import configure_conversion
+from gptc.manifest import content_hash
+from gptc.render_plan import format_time
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_CACHE_MB = 64
+# Seconds a client may take to send its request line and headers.
+REQUEST_TIMEOUT = 30
+MAX_HEADERS = 100
+
+_PAGE = ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{title}</title></head>\n'
+         '<body>\n{body}\n</body></html>\n')
+_CONTENT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "md": "text/markdown; charset=utf-8",
+}
+# Pages never need scripts, plugins or frames, whatever links a message contains.
+_CONTENT_SECURITY_POLICY = "script-src 'none'; object-src 'none'; frame-src 'none'; base-uri 'none'"
+
+_cache = None
+_plan = None
+_renderer = None
+
+
+def _init_worker(cache_path, config_file):
+    global _cache, _plan, _renderer
+    from gptc.markdown_blocks import BlockRenderer
+    _cache = ExportCache(cache_path)
+    _plan = configure_conversion(config_file)
+    # Messages may contain pasted HTML, which must not run on this origin.
+    _renderer = BlockRenderer(escape_html=True)
+
+
+def _render(key):
+    """
+    Render a cached conversation and return its {"md": bytes, "html": bytes}
+    pages, or None if it is not in the cache.
+    """
+    thread = _cache.thread(key)
+    if thread is None:
+        return None
+    text = _plan.render(_plan.extract(thread))
+    page = _PAGE.format(title=html.escape(thread.title or "Untitled"), body=_renderer.render(text))
+    return {"md": text.encode("utf-8"), "html": page.encode("utf-8")}
+
+
+def _pages_size(pages):
+    return sum(len(body) for body in pages.values())
+
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ConversationServer:
+    """
+    The conversations of an export cache, rendered on demand for HTTP clients.
+    """
+
+    def __init__(self, cache_path, config_file=None, jobs=None, cache_size=DEFAULT_CACHE_MB << 20):
+        cache = ExportCache(cache_path)
+        try:
+            # Only the listing is kept in memory; threads are read by the workers.
+            self.entries = {key: (title, update_time, digest)
+                            for key, title, update_time, digest in cache.entries()}
+        finally:
+            cache.close()
+        self.fingerprint = configure_conversion(config_file).fingerprint[:16]
+        self.pages = LRUCache(cache_size, sizeof=_pages_size)
+        self.executor = ProcessPoolExecutor(jobs, initializer=_init_worker,
+                                            initargs=(cache_path, config_file))
+        self._rendering = {}
+        self._index = None
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def run(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        logging.info(f"Serving {len(self.entries)} conversations on http://{host}:{port}/")
+        async with server:
+            await server.serve_forever()
+
+    def index_page(self):
+        """
+        Return (ETag, HTML) of the conversation list, built on first use.
+        """
+        if self._index is None:
+            items = "\n".join(
+                f'<li><a href="/c/{quote(key, safe="")}">{html.escape(title or "Untitled")}</a>'
+                f' <small>{format_time(update_time)}</small>'
+                f' <a href="/c/{quote(key, safe="")}.md">md</a></li>'
+                for key, (title, update_time, _) in self.entries.items()
+            )
+            page = _PAGE.format(title="Conversations",
+                                body=f"<h1>Conversations</h1>\n<ul>\n{items}\n</ul>").encode("utf-8")
+            self._index = (f'"{content_hash(page)}"', page)
+        return self._index
+
+    async def render(self, key):
+        """
+        Return the rendered pages of a conversation, from the LRU cache or from the
+        workers. Concurrent requests for the same conversation share one render.
+        """
+        pages = self.pages.get(key)
+        if pages is not None:
+            return pages
+        future = self._rendering.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, _render, key)
+            self._rendering[key] = future
+            future.add_done_callback(partial(self._rendered, key))
+        # A client hanging up must not cancel a render other clients are waiting for.
+        return await asyncio.shield(future)
+
+    def _rendered(self, key, future):
+        del self._rendering[key]
+        if not future.cancelled() and future.exception() is None and future.result() is not None:
+            self.pages.put(key, future.result())
+
+    async def respond(self, method, target, headers):
+        """
+        Return (status, headers, body) for a request.
+        """
+        if method not in ("GET", "HEAD"):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"Allow": "GET, HEAD"}, b""
+        path = unquote(urlsplit(target).path)
+        if path == "/":
+            etag, body = self.index_page()
+            content_type = _CONTENT_TYPES["html"]
+            if _etag_matches(headers.get("if-none-match"), etag):
+                return HTTPStatus.NOT_MODIFIED, {"ETag": etag}, b""
+        elif path.startswith("/c/"):
+            key, kind = path[len("/c/"):], "html"
+            if key.endswith(".md"):
+                key, kind = key[:-len(".md")], "md"
+            entry = self.entries.get(key)
+            if entry is None:
+                return HTTPStatus.NOT_FOUND, {}, b"No such conversation.\n"
+            etag = f'"{entry[2]}-{self.fingerprint}-{kind}"'
+            if _etag_matches(headers.get("if-none-match"), etag):
+                return HTTPStatus.NOT_MODIFIED, {"ETag": etag}, b""
+            pages = await self.render(key)
+            if pages is None:
+                return HTTPStatus.NOT_FOUND, {}, b"No such conversation.\n"
+            body = pages[kind]
+            content_type = _CONTENT_TYPES[kind]
+        else:
+            return HTTPStatus.NOT_FOUND, {}, b"Not found.\n"
+        # no-cache: browsers may keep pages but must revalidate them with the ETag.
+        return HTTPStatus.OK, {"Content-Type": content_type, "ETag": etag,
+                               "Cache-Control": "no-cache",
+                               "Content-Security-Policy": _CONTENT_SECURITY_POLICY}, body
+
+    async def handle(self, reader, writer):
+        method = None
+        try:
+            try:
+                method, target, headers = await asyncio.wait_for(_read_request(reader), REQUEST_TIMEOUT)
+            except (ValueError, asyncio.LimitOverrunError, asyncio.IncompleteReadError):
+                status, response_headers, body = HTTPStatus.BAD_REQUEST, {}, b"Bad request.\n"
+            else:
+                try:
+                    status, response_headers, body = await self.respond(method, target, headers)
+                except Exception as e:
+                    logging.error(f"Failed to serve {target}: {type(e).__name__}: {e}")
+                    status, response_headers, body = HTTPStatus.INTERNAL_SERVER_ERROR, {}, b"Internal error.\n"
+            lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+                     f"Content-Length: {len(body)}", "Connection: close"]
+            lines.extend(f"{name}: {value}" for name, value in response_headers.items())
+            if body and "Content-Type" not in response_headers:
+                lines.append("Content-Type: text/plain; charset=utf-8")
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _read_request(reader):
+    """
+    Read an HTTP request line and its headers; returns (method, target, headers)
+    with lowercase header names. The request body, if any, is ignored.
+    """
+    request_line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+    parts = request_line.split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise ValueError(f"Malformed request line {request_line!r}")
+    headers = {}
+    for _ in range(MAX_HEADERS):
+        line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+        if not line:
+            return parts[0], parts[1], headers
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    raise ValueError("Too many request headers")
+
+
+def serve(source, config_file=None, host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=None,
+          cache_mb=DEFAULT_CACHE_MB):
+    """
+    Serve an export cache, or an export after ingesting it into its cache, until
+    interrupted.
+    """
+    cache_path = source if is_export_cache(source) else ingest(source)
+    server = ConversationServer(cache_path, config_file, jobs, cache_mb << 20)
+    try:
+        asyncio.run(server.run(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -1,109 +1,105 @@
 import os
-import json
 from pathlib import Path
-import re
-import html
-import icecream as ic 
+import logging
+from functools import partial
 
-icecream = ic.IceCreamDebugger()
-icecream.disable()
+from gptc.conversation_tree import conversation_id, linearize_conversation
+from gptc.manifest import Manifest, atomic_open, content_hash
+from gptc.markdown_normalize import normalize_chunks, normalize_markdown
+from gptc.output_writer import FilenameAllocator, OutputWriter
+from gptc.stream_reader import iter_conversations
 
-def post_process_md_file(md_filename):
-    """post_process the file to remove consecutive empty lines, add 'text' to the start
-    code blocks that don't have a language specified, punctuation at the end of 
-    headings"""
+# Identifies this converter's output format in the manifest; change it with the format
+# so incremental runs rewrite output written by an older version
+MANIFEST_SETTINGS = "simple_converter/2"
+
+def post_process_md_text(md_text):
+    """Apply the post-processing rules to Markdown text in memory: remove consecutive
+    empty lines, add 'text' to the start code blocks that don't have a language
+    specified, punctuation at the end of headings. Fenced code is left as it is"""
 
-    # Read in the file
-    with open(md_filename, "r") as f:
-        md_text = f.read()
+    return normalize_markdown(md_text)
 
-    # Remove consecutive empty lines
-    md_text = re.sub(r"\n{3,}", "\n\n", md_text)
 
-    # Add 'text' to the start of code blocks that don't have a language specified
-    md_text = re.sub(r"```([^`\n]+)\n", r"```text\n", md_text)
+def post_process_md_file(md_filename, chunk_size=1 << 16):
+    """post_process the file to remove consecutive empty lines, add 'text' to the start
+    code blocks that don't have a language specified, punctuation at the end of 
+    headings. The file is streamed through the normalizer and replaced atomically"""
 
-    # Add punctuation at the end of headings
-    md_text = re.sub(r"#+\s+([^\n]+)(?<![\.\?!:])$", r"# \1.", md_text, flags=re.MULTILINE)
+    with atomic_open(md_filename, "w") as dst:
+        # Close the file before it is replaced
+        with open(md_filename, "r", encoding="utf-8") as src:
+            dst.writelines(normalize_chunks(iter(partial(src.read, chunk_size), "")))
 
-    # Write the processed text back to the file
-    with open(md_filename, "w") as f:
-        f.write(md_text)
 
-def process_json_file(filename):
-    """Read in a JSON file and output individual Markdown files"""
+def process_json_file(filename, incremental=False, prune=False):
+    """Read in a JSON file, or the zip archive of an export, and output individual Markdown files
 
-    with open(filename, "r") as f:
-        data = json.load(f)
+    Files are named after the title and id of each conversation and written on a
+    thread pool. With incremental, conversations that are unchanged since the last run
+    are skipped and changed ones are rewritten atomically; prune also deletes the
+    output of conversations that are no longer in the export"""
 
     parent_dir = Path(filename).parent
     subdirectory = Path(filename).stem
 
-    # Loop over items in the root level
-
-    for i, item in enumerate(data):
-        title = item["title"]
-
-        # Create a subdirectory from the source file at filename
-        try:
-            filename = f"{title.lower().replace(' ', '_')}.md"
-        except AttributeError as att:
-            filename = f"{str(i)}.md"
-            print(att)
-
-        # Create the directory for the file if it doesn't exist
+    # Create the output directory once, up front
 
-        filepath = parent_dir / subdirectory / filename
+    output_dir = parent_dir / subdirectory
+    os.makedirs(output_dir, exist_ok=True)
 
-        os.makedirs(filepath.parent, exist_ok=True)
+    manifest = Manifest.load(output_dir, MANIFEST_SETTINGS) if incremental else None
+    allocator = (FilenameAllocator(manifest.paths(), manifest.reclaimable)
+                 if manifest is not None else FilenameAllocator())
 
-        # Write the header for the document
-
-        title_newline = "\n\n"
-
-        with open(filepath, "w") as f:
-            f.write(f"# {title}{title_newline}")
+    # Loop over items in the root level
 
-        # Recursively loop over nested objects and write them out
+    with OutputWriter(output_dir) as writer:
+        for i, (item, raw) in enumerate(iter_conversations(filename, with_raw=True)):
+            if manifest is not None:
+                digest = content_hash(raw)
+                if manifest.unchanged(digest):
+                    continue
 
-        process_nested_object("", 1, filepath, item)
-        icecream(filepath)
-        post_process_md_file(filepath)
+            title = item.get("title")
+            item_id = conversation_id(item)
+            key = manifest.stage(item_id, item.get("update_time"), digest) if manifest is not None else None
+            md_filename = allocator.allocate(title, item_id, i, key)
+            logging.debug("Writing %s", output_dir / md_filename)
 
+            # Build the whole document in memory, post-process it and write it once
 
-def process_nested_object(prefix, depth, filepath, obj):
-    """Recursively iterate over nested objects and write them out"""
+            buffer = []
+            buffer.append(f"# {title or 'Untitled'}\n\n")
+            render_thread(buffer, linearize_conversation(item).messages)
 
-    for key, value in obj.items():
-        if isinstance(value, dict):
-            new_prefix = prefix + "-" + key.lower()
+            on_done = None
+            if manifest is not None:
+                on_done = partial(manifest.record, key, md_filename)
+            writer.write(md_filename, post_process_md_text("".join(buffer)), on_done)
 
-            process_nested_object(new_prefix, depth + 1, filepath, value)
+    if manifest is not None:
+        # Pruning after a failed write would delete the last good copy
+        manifest.complete = not writer.failures
+        if prune:
+            manifest.prune()
+        manifest.save()
 
-        else:
-            # Add leading newline for all but top-level headers
 
-            lead_newline = "" if depth == 1 else "\n"
+def render_thread(buffer, messages):
+    """Append the messages of a linearized conversation thread to a list of strings"""
 
-            line = "{}{}: {}\n".format(lead_newline, "-".join([prefix, key]), value)
+    newline = "\n"
 
-            newline = "\n"
+    for message in messages:
+        role = message.role
 
-            # Append the line to the file
-            strings_to_check = [
-                "message-content-parts:",
-                "message-author-role: assistant",
-                "message-author-role: user"
-                ]
+        # Only the user and assistant turns get a speaker header
+        if role in ("assistant", "user"):
+            buffer.append(f"{newline}{newline}{role.upper()} >>{newline}")
 
-            if any(s in line for s in strings_to_check):
-                if isinstance(value, list):
-                    for sent_message in value:
-                        with open(filepath, "a") as f:
-                            f.write(f"{newline}{str(sent_message)}")
-                else:
-                    with open(filepath, "a") as f:
-                        f.write(f"{newline}{newline}{str(value).upper()} >>{newline}")
+        for sent_message in message.parts:
+            buffer.append(f"{newline}{str(sent_message)}")
 
 if __name__ == "__main__":
     filename = "conversations.json"
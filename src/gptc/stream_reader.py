@@ -0,0 +1,331 @@
+"""
+Read the conversations of an export one at a time.
+
+The export is decoded into a sliding text window and each element of the root array
+is handed to the C JSON decoder with `raw_decode`, so only one conversation plus one
+read chunk is in memory at a time. An element that runs past the window is retried
+once more text has been read; the window grows geometrically, so even a very large
+conversation is decoded in linear time.
+
+Callers that only want the raw bytes of each conversation, such as the parallel
+pipeline and the second pass of a merge, must not pay for decoding: they are read
+by a byte scanner instead, which matches each element with a regular expression for
+balanced brackets over a copy of the window whose escaped quotes and backslashes are
+masked, without decoding either the UTF-8 or the JSON. Only an element that runs
+past the window, or nests deeper than the expression allows, is handed to the
+decoder to find its end.
+
+Exports can be read from a plain conversations.json, which is memory-mapped, or
+straight from the zip archive of the official export, which is decompressed as it
+is read.
+"""
+
+import codecs
+import json
+import mmap
+import os
+import re
+import sys
+import zipfile
+from contextlib import contextmanager
+
+CHUNK_SIZE = 1 << 20
+EXPORT_MEMBER = "conversations.json"
+# Deepest nesting of an element that the byte scanner matches without the decoder.
+SCAN_DEPTH = 32
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = re.compile(r"[ \t\r\n,]*")
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_BYTE_SEPARATORS = re.compile(rb"[ \t\r\n,]*")
+_BYTE_WHITESPACE = re.compile(rb"[ \t\r\n]*")
+
+
+def _element_pattern(depth):
+    """
+    Compile a pattern matching a JSON object or array nested at most depth levels,
+    in text whose escapes are masked, so that every quote delimits a string.
+    """
+    # Possessive quantifiers (Python 3.11+) stop a failed match from backtracking.
+    run, many = (rb"++", rb"*+") if sys.version_info >= (3, 11) else (b"", b"*")
+    body = b""
+    for _ in range(depth):
+        nested = rb"|[{\[]" + body + rb"[}\]]" if body else b""
+        body = rb'(?:[^"{}\[\]]' + run + rb'|"[^"]*"' + nested + rb")" + many
+    return re.compile(rb"[{\[]" + body + rb"[}\]]")
+
+
+_ELEMENT = _element_pattern(SCAN_DEPTH)
+
+
+def _stream_chunks(stream, chunk_size):
+    """Yield the bytes of a binary stream in chunks."""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _mmap_chunks(mapped, chunk_size):
+    """Yield zero-copy views of a memory-mapped file in chunks."""
+    with memoryview(mapped) as view:
+        for start in range(0, len(view), chunk_size):
+            with view[start:start + chunk_size] as chunk:
+                yield chunk
+
+
+def _text_chunks(byte_chunks):
+    """Decode UTF-8 chunks, with or without a BOM, that may split characters."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def _iter_elements(text_chunks, want_text=False, select=None):
+    """
+    Yield (value, source text) for each element of the top-level array. The source
+    text is only sliced out when want_text is set, otherwise it is None. Elements
+    for which select(value) is false are dropped as soon as they are decoded.
+    """
+    text_chunks = iter(text_chunks)
+    window = ""
+    pos = 0
+    eof = False
+
+    def read_more(minimum):
+        # Drop the consumed prefix and append at least `minimum` characters.
+        nonlocal window, pos, eof
+        pieces = [window[pos:]]
+        added = 0
+        while added < minimum:
+            piece = next(text_chunks, None)
+            if piece is None:
+                eof = True
+                break
+            pieces.append(piece)
+            added += len(piece)
+        window = "".join(pieces)
+        pos = 0
+
+    # Find the opening bracket of the root array.
+    while True:
+        pos = _WHITESPACE.match(window, pos).end()
+        if pos < len(window) or eof:
+            break
+        read_more(1)
+    if pos >= len(window):
+        raise ValueError("The export is empty.")
+    if window[pos] != "[":
+        raise ValueError("The export does not contain a top-level JSON array.")
+    pos += 1
+
+    while True:
+        pos = _SEPARATORS.match(window, pos).end()
+        if pos >= len(window):
+            if eof:
+                raise ValueError("Unexpected end of export inside the top-level array.")
+            read_more(1)
+            continue
+
+        lead = window[pos]
+        if lead == "]":
+            return
+        if lead not in "{[":
+            raise ValueError(f"Unsupported top-level element starting with {lead!r}.")
+
+        try:
+            value, end = _decoder.raw_decode(window, pos)
+        except json.JSONDecodeError as error:
+            if eof:
+                raise ValueError(f"Truncated or malformed element in export: {error}") from error
+            # The element may continue past the window; at least double what is buffered.
+            read_more(max(1, len(window) - pos))
+            continue
+        if select is None or select(value):
+            yield value, window[pos:end] if want_text else None
+        pos = end
+
+
+def _mask_escapes(data):
+    """Replace escaped backslashes and quotes with other bytes of the same length."""
+    if b"\\" not in data:
+        return data
+    return data.replace(b"\\\\", b"__").replace(b'\\"', b"__")
+
+
+def _decoded_end(data, pos, eof):
+    """
+    Return the end of the element at pos found with the decoder, or None if it
+    continues past the end of data.
+    """
+    text = codecs.getincrementaldecoder("utf-8")().decode(data[pos:], final=eof)
+    try:
+        _, end = _decoder.raw_decode(text)
+    except json.JSONDecodeError as error:
+        if eof:
+            raise ValueError(f"Truncated or malformed element in export: {error}") from error
+        return None
+    return pos + len(text[:end].encode("utf-8"))
+
+
+def _iter_raw_elements(byte_chunks):
+    """
+    Yield the raw bytes of each element of the top-level array, without decoding it.
+    """
+    byte_chunks = iter(byte_chunks)
+    window = masked = b""
+    pos = 0
+    eof = False
+
+    def read_more(minimum):
+        # Drop the consumed prefix, which always ends outside a string, and append
+        # at least `minimum` bytes.
+        nonlocal window, masked, pos, eof
+        pieces = [window[pos:]]
+        added = 0
+        while added < minimum:
+            piece = next(byte_chunks, None)
+            if piece is None:
+                eof = True
+                break
+            # Copy the piece: memory-mapped views are released once the next is read.
+            pieces.append(bytes(piece))
+            added += len(piece)
+        window = b"".join(pieces)
+        masked = _mask_escapes(window)
+        pos = 0
+
+    # Find the opening bracket of the root array, after an optional BOM.
+    while len(window) < len(codecs.BOM_UTF8) and not eof:
+        read_more(1)
+    if window.startswith(codecs.BOM_UTF8):
+        pos = len(codecs.BOM_UTF8)
+    while True:
+        pos = _BYTE_WHITESPACE.match(window, pos).end()
+        if pos < len(window) or eof:
+            break
+        read_more(1)
+    if pos >= len(window):
+        raise ValueError("The export is empty.")
+    if window[pos] != ord("["):
+        raise ValueError("The export does not contain a top-level JSON array.")
+    pos += 1
+
+    while True:
+        pos = _BYTE_SEPARATORS.match(window, pos).end()
+        if pos >= len(window):
+            if eof:
+                raise ValueError("Unexpected end of export inside the top-level array.")
+            read_more(1)
+            continue
+
+        lead = window[pos]
+        if lead == ord("]"):
+            return
+        if lead not in b"{[":
+            raise ValueError(f"Unsupported top-level element starting with {chr(lead)!r}.")
+
+        match = _ELEMENT.match(masked, pos)
+        end = match.end() if match else _decoded_end(window, pos, eof)
+        if end is None:
+            # The element may continue past the window; at least double what is buffered.
+            read_more(max(1, len(window) - pos))
+            continue
+        yield window[pos:end]
+        pos = end
+
+
+def iter_items(stream, chunk_size=CHUNK_SIZE):
+    """
+    Yield each element of the top-level JSON array in a binary stream.
+    """
+    for value, _ in _iter_elements(_text_chunks(_stream_chunks(stream, chunk_size))):
+        yield value
+
+
+def iter_raw_items(stream, chunk_size=CHUNK_SIZE):
+    """
+    Yield the raw UTF-8 bytes of each element of the top-level JSON array in a binary stream.
+    """
+    return _iter_raw_elements(_stream_chunks(stream, chunk_size))
+
+
+def find_export_member(archive):
+    """
+    Return the name of the conversations.json member of a zip archive.
+    """
+    candidates = [
+        name for name in archive.namelist()
+        if name.rsplit("/", 1)[-1] == EXPORT_MEMBER
+    ]
+    if not candidates:
+        raise ValueError(f"The archive does not contain {EXPORT_MEMBER}.")
+    return min(candidates, key=lambda name: name.count("/"))
+
+
+@contextmanager
+def _export_chunks(file_path, chunk_size, text=True):
+    """
+    Open an export and yield an iterator over its decoded text, or over its bytes
+    if text is false.
+
+    Zip archives are decompressed on the fly; plain files are memory-mapped so the
+    decoder reads straight from the page cache instead of through a read buffer.
+    """
+    if zipfile.is_zipfile(file_path):
+        with zipfile.ZipFile(file_path) as archive:
+            with archive.open(find_export_member(archive)) as member:
+                chunks = _stream_chunks(member, chunk_size)
+                yield _text_chunks(chunks) if text else chunks
+        return
+
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files cannot be mapped.
+            chunks = _stream_chunks(f, chunk_size)
+            yield _text_chunks(chunks) if text else chunks
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            views = _mmap_chunks(mapped, chunk_size)
+            chunks = _text_chunks(views) if text else views
+            try:
+                yield chunks
+            finally:
+                # Release the buffer views before the map is closed.
+                chunks.close()
+                views.close()
+
+
+def iter_conversations(file_path, chunk_size=CHUNK_SIZE, with_raw=False, select=None):
+    """
+    Lazily yield each conversation in an export, or in the zip archive of one, as a
+    Python dictionary. With `with_raw`, yield (conversation, raw UTF-8 bytes) pairs
+    instead, so callers that hash the source do not have to decode it twice.
+
+    With `select`, only conversations for which select(conversation) is true are
+    yielded.
+    """
+    with _export_chunks(file_path, chunk_size) as text_chunks:
+        for value, text in _iter_elements(text_chunks, want_text=with_raw, select=select):
+            yield (value, text.encode("utf-8")) if with_raw else value
+
+
+def iter_raw_conversations(file_path, chunk_size=CHUNK_SIZE, select=None):
+    """
+    Lazily yield the raw UTF-8 JSON bytes of each conversation in an export, or in
+    the zip archive of one, without decoding them. With `select`, conversations are
+    decoded after all, and only those for which select(conversation) is true are
+    yielded.
+    """
+    if select is not None:
+        for _, raw in iter_conversations(file_path, chunk_size, with_raw=True, select=select):
+            yield raw
+        return
+    with _export_chunks(file_path, chunk_size, text=False) as byte_chunks:
+        yield from _iter_raw_elements(byte_chunks)
@@ -0,0 +1,193 @@
+"""
+Generate synthetic conversations.json exports for benchmarking.
+
+The generated conversations follow the layout of a real export (see json_sample.json):
+a null root node, a hidden system message, then alternating user and assistant
+turns. Assistant turns can be regenerated, which adds sibling branches, and
+`current_node` points at the newest leaf.
+"""
+
+import argparse
+import json
+import os
+import random
+import uuid
+
+_WORDS = (
+    "the of and to in is that for it as with was on be by this are or from at "
+    "python function class method return value list dict string file path data "
+    "model token export conversation message thread branch render markdown json "
+    "parse stream buffer cache index config error test bench memory time size"
+).split()
+
+_UNICODE_WORDS = (
+    "naïve café façade déjà résumé Ærø Straße Übergröße über "
+    "日本語 中文 한국어 ελληνικά русский עברית العربية हिन्दी "
+    "🙂 🚀 ✨ 🧪 📦 —— «quote» “curly” ½ ∑ √ ∞"
+).split()
+
+_MODEL_SLUGS = ("text-davinci-002-render-sha", "gpt-4", "gpt-4o", "gpt-3.5-turbo")
+
+
+class _TextMaker:
+    """Produce pseudo-random paragraphs, headings and code blocks of a target size."""
+
+    def __init__(self, rng, unicode_mix):
+        self.rng = rng
+        self.unicode_mix = unicode_mix
+
+    def words(self, count):
+        rng = self.rng
+        return " ".join(
+            rng.choice(_UNICODE_WORDS) if rng.random() < self.unicode_mix else rng.choice(_WORDS)
+            for _ in range(count)
+        )
+
+    def text(self, size):
+        rng = self.rng
+        chunks = []
+        length = 0
+        while length < size:
+            roll = rng.random()
+            if roll < 0.1:
+                chunk = f"## {self.words(rng.randint(2, 6)).capitalize()}"
+            elif roll < 0.2:
+                language = rng.choice(("python", "bash", "json", ""))
+                body = "\n".join(f"    {self.words(rng.randint(3, 8))}" for _ in range(rng.randint(2, 8)))
+                chunk = f"```{language}\n{body}\n```"
+            else:
+                chunk = self.words(rng.randint(10, 60)).capitalize() + "."
+            chunks.append(chunk)
+            length += len(chunk) + 2
+        return "\n\n".join(chunks)
+
+
+def _node(node_id, parent, message=None):
+    return {"id": node_id, "message": message, "parent": parent, "children": []}
+
+
+def _message(node_id, role, text, create_time, model_slug=None, parent_id=None):
+    metadata = {"timestamp_": "absolute", "message_type": None}
+    if role == "assistant":
+        metadata.update({
+            "finish_details": {"type": "stop", "stop_tokens": [100260]},
+            "is_complete": True,
+            "model_slug": model_slug,
+            "parent_id": parent_id,
+        })
+    return {
+        "id": node_id,
+        "author": {"role": role, "name": None, "metadata": {}},
+        "create_time": create_time,
+        "update_time": None,
+        "content": {"content_type": "text", "parts": [text]},
+        "status": "finished_successfully",
+        "end_turn": True if role == "assistant" else None,
+        "weight": 1.0,
+        "metadata": metadata,
+        "recipient": "all",
+    }
+
+
+def generate_conversation(rng, messages=20, branching=0.1, part_size=800, unicode_mix=0.02,
+                          start_time=1.69e9):
+    """
+    Return one synthetic conversation with `messages` turns on its current thread.
+
+    Each assistant turn is regenerated with probability `branching`; the abandoned
+    replies stay in the mapping as sibling leaves.
+    """
+    maker = _TextMaker(rng, unicode_mix)
+    mapping = {}
+    model_slug = rng.choice(_MODEL_SLUGS)
+    clock = start_time + rng.random() * 3e7
+
+    def new_id():
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    root_id = new_id()
+    mapping[root_id] = _node(root_id, None)
+    system_id = new_id()
+    mapping[system_id] = _node(system_id, root_id, _message(system_id, "system", "", None))
+    mapping[root_id]["children"].append(system_id)
+
+    create_time = clock
+    leaf = system_id
+    for turn in range(messages):
+        role = "user" if turn % 2 == 0 else "assistant"
+        clock += rng.uniform(5, 120)
+        size = max(1, int(rng.expovariate(1 / part_size))) if role == "assistant" else max(1, part_size // 4)
+        alternatives = 1
+        if role == "assistant":
+            while rng.random() < branching and alternatives < 5:
+                alternatives += 1
+        for _ in range(alternatives):
+            node_id = new_id()
+            message = _message(node_id, role, maker.text(size), clock, model_slug, leaf)
+            mapping[node_id] = _node(node_id, leaf, message)
+            mapping[leaf]["children"].append(node_id)
+        leaf = mapping[leaf]["children"][-1]
+
+    conversation_id = new_id()
+    return {
+        "title": maker.words(rng.randint(2, 6)).title(),
+        "create_time": create_time,
+        "update_time": clock,
+        "mapping": mapping,
+        "moderation_results": [],
+        "current_node": leaf,
+        "plugin_ids": None,
+        "conversation_id": conversation_id,
+        "conversation_template_id": None,
+        "id": conversation_id,
+    }
+
+
+def write_export(path, conversations=100, messages=20, branching=0.1, part_size=800,
+                 unicode_mix=0.02, seed=0):
+    """
+    Write a synthetic export to path one conversation at a time and return its size in bytes.
+
+    The same arguments always produce the same file.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i in range(conversations):
+            if i:
+                f.write(", ")
+            conversation = generate_conversation(rng, messages, branching, part_size, unicode_mix)
+            f.write(json.dumps(conversation, ensure_ascii=False))
+        f.write("]")
+    return os.path.getsize(path)
+
+
+def add_generate_arguments(parser, output=True):
+    """
+    Add the generator options to an argparse parser, with or without the output path.
+    """
+    if output:
+        parser.add_argument("output", help="Path of the conversations.json to write.")
+    parser.add_argument("-c", "--conversations", type=int, default=100,
+                        help="Number of conversations.")
+    parser.add_argument("-m", "--messages", type=int, default=20,
+                        help="Messages on the current thread of each conversation.")
+    parser.add_argument("-b", "--branching", type=float, default=0.1,
+                        help="Probability that an assistant reply was regenerated.")
+    parser.add_argument("-s", "--part-size", type=int, default=800,
+                        help="Mean size of an assistant message in characters.")
+    parser.add_argument("-u", "--unicode-mix", type=float, default=0.02,
+                        help="Fraction of words drawn from non-ASCII scripts and emoji.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    return parser
+
+
+def generate_from_args(args, path=None):
+    return write_export(path or args.output, args.conversations, args.messages, args.branching,
+                        args.part_size, args.unicode_mix, args.seed)
+
+
+if __name__ == "__main__":
+    parser = add_generate_arguments(argparse.ArgumentParser(
+        description="Generate a synthetic conversations.json export."))
+    print(f"Wrote {generate_from_args(parser.parse_args())} bytes.")
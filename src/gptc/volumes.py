@@ -0,0 +1,142 @@
+"""
+Single-file output split into size-bounded volumes, with a table of contents.
+
+Conversations are appended to the current volume, separated by a horizontal rule,
+until the next one would push it past the volume size; then a new volume is started.
+A conversation larger than the volume size gets a volume of its own. Without a
+volume size everything goes into the output file itself, as before.
+
+Next to the output, `<output>.toc.json` records the volume, byte offset and byte
+length of every conversation, so a reader can seek straight to one conversation:
+
+    {"version": 1, "volumes": ["all.001.md", ...],
+     "conversations": [{"id": ..., "title": ..., "volume": 0, "offset": 0, "length": 1234}, ...]}
+
+Volume names in the TOC are relative to the directory of the TOC.
+"""
+
+import json
+import logging
+import os
+
+from gptc.manifest import atomic_write_text
+
+TOC_SUFFIX = ".toc.json"
+TOC_VERSION = 1
+SEPARATOR = "\n---\n".encode("utf-8")
+
+
+def toc_path(output_path):
+    """
+    Return the path of the table of contents of a single-file output.
+    """
+    return output_path + TOC_SUFFIX
+
+
+def volume_path(output_path, number):
+    """
+    Return the path of the given volume (counted from 1) of a split output.
+    """
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.{number:03d}{ext}"
+
+
+class VolumeWriter:
+    """
+    Write rendered conversations into volumes of at most `volume_size` bytes, or
+    into output_path alone when volume_size is 0, and record them in a TOC.
+    """
+
+    def __init__(self, output_path, volume_size=0):
+        self.output_path = output_path
+        self.volume_size = volume_size
+        self.volumes = []
+        self.entries = []
+        self._file = None
+        self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _next_volume(self):
+        if self._file is not None:
+            self._file.close()
+        if self.volume_size:
+            path = volume_path(self.output_path, len(self.volumes) + 1)
+        else:
+            path = self.output_path
+        self._file = open(path, "wb")
+        self._size = 0
+        self.volumes.append(path)
+
+    def write(self, conversation_id, title, markdown_text):
+        data = markdown_text.encode("utf-8")
+        if self._file is None or (self.volume_size and self._size
+                                  and self._size + len(SEPARATOR) + len(data) > self.volume_size):
+            self._next_volume()
+        if self._size:
+            self._file.write(SEPARATOR)
+            self._size += len(SEPARATOR)
+        self._file.write(data)
+        self.entries.append({
+            "id": conversation_id,
+            "title": title,
+            "volume": len(self.volumes) - 1,
+            "offset": self._size,
+            "length": len(data),
+        })
+        self._size += len(data)
+
+    def close(self):
+        """
+        Finish the last volume, write the TOC and remove volumes left over from an
+        earlier, longer run.
+        """
+        if self._file is None:
+            # Nothing was written; still leave an empty output behind.
+            self._next_volume()
+        self._file.close()
+        path = toc_path(self.output_path)
+        base = os.path.dirname(os.path.abspath(path))
+        old_volumes = []
+        if os.path.exists(path):
+            try:
+                old_volumes = [os.path.join(base, name) for name in read_toc(path)["volumes"]]
+            except (OSError, ValueError, KeyError):
+                logging.warning(f"Ignoring unreadable table of contents {path}.")
+        toc = {
+            "version": TOC_VERSION,
+            "volumes": [os.path.relpath(os.path.abspath(volume), base) for volume in self.volumes],
+            "conversations": self.entries,
+        }
+        atomic_write_text(path, json.dumps(toc, ensure_ascii=False, indent=1))
+        current = {os.path.abspath(volume) for volume in self.volumes}
+        for volume in old_volumes:
+            if os.path.abspath(volume) not in current and os.path.exists(volume):
+                os.remove(volume)
+        logging.info(f"Wrote {len(self.entries)} conversations to {len(self.volumes)} volume(s).")
+
+
+def read_toc(path):
+    """
+    Load a table of contents written by VolumeWriter.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        toc = json.load(f)
+    if toc.get("version") != TOC_VERSION:
+        raise ValueError(f"Unsupported table of contents version in {path}.")
+    return toc
+
+
+def read_conversation(toc_file, entry, toc=None):
+    """
+    Return the Markdown of one TOC entry, reading only its bytes from its volume.
+    """
+    toc = toc or read_toc(toc_file)
+    volume = os.path.join(os.path.dirname(os.path.abspath(toc_file)), toc["volumes"][entry["volume"]])
+    with open(volume, "rb") as f:
+        f.seek(entry["offset"])
+        return f.read(entry["length"]).decode("utf-8")
@@ -0,0 +1,72 @@
+from gptc.conversation_tree import branch_paths, current_path, find_root, linearize_conversation
+
+
+def node(node_id, parent, children, text=None, role="user"):
+    message = None
+    if text is not None:
+        message = {"id": node_id, "author": {"role": role},
+                   "content": {"content_type": "text", "parts": [text]}}
+    return {"id": node_id, "parent": parent, "children": children, "message": message}
+
+
+# root -> q -> (a1 | a2 -> q2 -> a3); a2 is a regenerated reply.
+MAPPING = {
+    "root": node("root", None, ["q"]),
+    "q": node("q", "root", ["a1", "a2"], "question"),
+    "a1": node("a1", "q", [], "first answer", "assistant"),
+    "a2": node("a2", "q", ["q2"], "second answer", "assistant"),
+    "q2": node("q2", "a2", ["a3"], "follow-up"),
+    "a3": node("a3", "q2", [], "last answer", "assistant"),
+}
+
+
+def test_find_root():
+    assert find_root(MAPPING) == "root"
+    assert find_root({}) is None
+
+
+def test_current_path_follows_the_leaf():
+    assert current_path(MAPPING, "a1") == ["root", "q", "a1"]
+    assert current_path(MAPPING, "a3") == ["root", "q", "a2", "q2", "a3"]
+
+
+def test_current_path_without_leaf_takes_the_latest_branch():
+    assert current_path(MAPPING) == ["root", "q", "a2", "q2", "a3"]
+    assert current_path(MAPPING, "missing") == ["root", "q", "a2", "q2", "a3"]
+    assert current_path({}) == []
+
+
+def test_current_path_stops_at_a_cycle():
+    mapping = {"a": node("a", "b", ["b"]), "b": node("b", "a", ["a"])}
+    assert current_path(mapping, "a") == ["b", "a"]
+
+
+def test_branch_paths_lists_every_branch_oldest_first():
+    assert branch_paths(MAPPING) == [
+        ["root", "q", "a1"],
+        ["root", "q", "a2", "q2", "a3"],
+    ]
+    assert branch_paths({}) == []
+
+
+def test_branch_paths_handles_deep_threads():
+    depth = 5000
+    mapping = {str(i): node(str(i), str(i - 1) if i else None, [str(i + 1)] if i < depth - 1 else [])
+               for i in range(depth)}
+    paths = branch_paths(mapping)
+    assert len(paths) == 1 and len(paths[0]) == depth
+
+
+def test_linearize_conversation():
+    conversation = {"id": "c1", "title": "T", "create_time": 1.0, "update_time": 2.0,
+                    "current_node": "a1", "mapping": MAPPING}
+    thread = linearize_conversation(conversation, include_branches=True)
+    assert thread.id == "c1"
+    # The root has no message and is skipped.
+    assert [m.parts[0] for m in thread.messages] == ["question", "first answer"]
+    assert [[m.id for m in branch] for branch in thread.branches] == [
+        ["q", "a1"],
+        ["q", "a2", "q2", "a3"],
+    ]
+    # Messages shared by several branches are the same record.
+    assert thread.branches[0][0] is thread.branches[1][0]
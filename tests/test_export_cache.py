@@ -0,0 +1,79 @@
+import json
+
+from gptc.conversation_tree import linearize_conversation
+from gptc.export_cache import ExportCache, decode_messages, encode_messages, is_export_cache
+from gptc.models import Message
+
+MESSAGES = [
+    Message(id="m1", role="user", content_type="text", parts=["Hello ✓", ""], create_time=1.5,
+            status="finished_successfully", weight=1.0, model_slug=None),
+    Message(id="m2", role="assistant", name="tool", content_type="multimodal_text",
+            parts=[{"asset_pointer": "file-1"}, "caption"], end_turn=True,
+            finish_details={"type": "stop"}, timestamp="absolute", message_type="next",
+            model_slug="gpt-4", parent_id="m1", is_user_system_message=False,
+            user_context_message_data={"about_user_message": "x"}),
+    Message(id="m3", role="assistant", content_type="text", parts=[], model_slug="gpt-4",
+            parent_id="m2"),
+]
+
+
+def test_encode_decode_round_trip():
+    decoded = decode_messages(encode_messages(MESSAGES))
+    assert [m.values() for m in decoded] == [m.values() for m in MESSAGES]
+    # Recurring strings come back as one shared object.
+    assert decoded[1].model_slug is decoded[2].model_slug
+
+
+def test_encode_decode_empty():
+    assert decode_messages(encode_messages([])) == []
+
+
+def node(node_id, parent, children, text):
+    message = None if text is None else {
+        "id": node_id, "author": {"role": "user"}, "content": {"content_type": "text", "parts": [text]}}
+    return {"id": node_id, "parent": parent, "children": children, "message": message}
+
+
+def conversation(conversation_id, text, update_time=1.0):
+    return {"id": conversation_id, "title": f"Title {conversation_id}", "create_time": 0.0,
+            "update_time": update_time, "current_node": "b",
+            "mapping": {"a": node("a", None, ["b"], None), "b": node("b", "a", [], text)}}
+
+
+def pairs(conversations):
+    return [(c, json.dumps(c).encode("utf-8")) for c in conversations]
+
+
+def test_ingest_and_read_back(tmp_path):
+    path = str(tmp_path / "export.gptc")
+    export = [conversation("a", "one"), conversation("b", "two"), conversation(None, "three")]
+    cache = ExportCache(path)
+    assert cache.ingest_conversations(pairs(export), "test") == (3, 0)
+    threads = list(cache.threads())
+    assert [t.id for t in threads] == ["a", "b", None]
+    expected = [linearize_conversation(c) for c in export]
+    assert [[m.values() for m in t.messages] for t in threads] == \
+           [[m.values() for m in t.messages] for t in expected]
+    assert cache.thread("b").title == "Title b"
+    assert cache.thread("#2").messages[0].parts == ["three"]
+    cache.close()
+    assert is_export_cache(path)
+
+
+def test_reingest_stores_only_changes(tmp_path):
+    cache = ExportCache(str(tmp_path / "export.gptc"))
+    cache.ingest_conversations(pairs([conversation("a", "one"), conversation("b", "two")]), "test")
+    changed = [conversation("c", "new"), conversation("b", "two, edited", 2.0), conversation("a", "one")]
+    assert cache.ingest_conversations(pairs(changed), "test") == (2, 1)
+    assert [key for key, *_ in cache.entries()] == ["c", "b", "a"]
+    assert cache.thread("b").messages[0].parts == ["two, edited"]
+    assert cache.ingest_conversations(pairs(changed[:1]), "test") == (0, 1)
+    assert len(cache) == 1
+    cache.close()
+
+
+def test_is_export_cache(tmp_path):
+    export = tmp_path / "conversations.json"
+    export.write_text("[]", encoding="utf-8")
+    assert not is_export_cache(str(export))
+    assert not is_export_cache(str(tmp_path / "missing"))
@@ -0,0 +1,84 @@
+import argparse
+
+import pytest
+
+from gptc.conversation_tree import linearize_conversation
+from gptc.filters import ConversationFilter, add_filter_arguments, filter_from_args, parse_date
+
+
+def message(node_id, role, model_slug=None):
+    return {"id": node_id, "author": {"role": role},
+            "content": {"content_type": "text", "parts": [node_id]},
+            "metadata": {"model_slug": model_slug} if model_slug else {}}
+
+
+def conversation(title="Python decorators", create_time=100.0, update_time=200.0, current_node="b1"):
+    # The current thread answers with gpt-3.5; a regenerated reply used gpt-4.
+    return {
+        "id": "c1", "title": title, "create_time": create_time, "update_time": update_time,
+        "current_node": current_node,
+        "mapping": {
+            "root": {"id": "root", "parent": None, "children": ["q"], "message": None},
+            "q": {"id": "q", "parent": "root", "children": ["b1", "b2"], "message": message("q", "user")},
+            "b1": {"id": "b1", "parent": "q", "children": [], "message": message("b1", "assistant", "gpt-3.5")},
+            "b2": {"id": "b2", "parent": "q", "children": [], "message": message("b2", "assistant", "gpt-4")},
+        },
+    }
+
+
+def matches(conversation_filter, exported):
+    """Return the verdicts for the export and for its linearized, cached form."""
+    return conversation_filter(exported), conversation_filter.matches_thread(linearize_conversation(exported))
+
+
+def test_parse_date():
+    assert parse_date("1970-01-02") == 86400
+    assert parse_date("1970-01-01T01:00+01:00") == 0
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_date("yesterday")
+
+
+def test_empty_filter_is_false():
+    assert not ConversationFilter()
+    assert ConversationFilter(model_slug="gpt-4")
+
+
+@pytest.mark.parametrize("criteria, expected", [
+    ({}, True),
+    ({"since": 200.0}, True),
+    ({"since": 200.5}, False),
+    ({"until": 200.0}, False),
+    ({"until": 200.5}, True),
+    ({"title": "decorat"}, True),
+    ({"title": "^decorat"}, False),
+])
+def test_header_criteria(criteria, expected):
+    assert matches(ConversationFilter(**criteria), conversation()) == (expected, expected)
+
+
+def test_create_time_stands_in_for_a_missing_update_time():
+    exported = conversation(update_time=None)
+    assert matches(ConversationFilter(since=100.0), exported) == (True, True)
+    assert matches(ConversationFilter(since=150.0), exported) == (False, False)
+    assert matches(ConversationFilter(since=0.0), conversation(create_time=None, update_time=None)) == (False, False)
+
+
+def test_model_is_matched_on_the_current_thread_only():
+    assert matches(ConversationFilter(model_slug="gpt-3.5"), conversation()) == (True, True)
+    assert matches(ConversationFilter(model_slug="gpt-4"), conversation()) == (False, False)
+    assert matches(ConversationFilter(model_slug="gpt-4"), conversation(current_node="b2")) == (True, True)
+
+
+def test_rejections_are_counted():
+    conversation_filter = ConversationFilter(title="nothing")
+    matches(conversation_filter, conversation())
+    assert conversation_filter.rejected == 2
+
+
+def test_filter_from_args():
+    parser = add_filter_arguments(argparse.ArgumentParser())
+    assert filter_from_args(parser.parse_args([])) is None
+    conversation_filter = filter_from_args(parser.parse_args(["--since", "1970-01-01", "--model", "gpt-4"]))
+    assert conversation_filter.since == 0 and conversation_filter.model_slug == "gpt-4"
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--title", "("])
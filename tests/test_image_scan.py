@@ -0,0 +1,93 @@
+import struct
+import zlib
+
+import pytest
+
+from gptc.image_scan import iter_image_files, read_image_size, scan_images
+
+
+def png(width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return b"\x89PNG\r\n\x1a\n" + chunk
+
+
+def segment(marker, payload):
+    return b"\xff" + bytes([marker]) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def exif(orientation, byte_order="<"):
+    mark = b"II" if byte_order == "<" else b"MM"
+    # One IFD entry: tag 0x0112, type SHORT, count 1, value.
+    ifd = struct.pack(byte_order + "H", 1) + struct.pack(byte_order + "HHIHH", 0x0112, 3, 1, orientation, 0)
+    tiff = mark + struct.pack(byte_order + "HI", 42, 8) + ifd + struct.pack(byte_order + "I", 0)
+    return segment(0xE1, b"Exif\x00\x00" + tiff)
+
+
+def jpeg(width, height, *segments, sof=0xC0):
+    frame = segment(sof, struct.pack(">BHHB", 8, height, width, 3) + b"\x00" * 9)
+    return b"\xff\xd8" + b"".join(segments) + frame + segment(0xDA, b"\x00" * 10) + b"\xff\xd9"
+
+
+def riff(chunk, payload):
+    data = chunk + struct.pack("<I", len(payload)) + payload
+    return b"RIFF" + struct.pack("<I", len(data) + 4) + b"WEBP" + data
+
+
+def webp_vp8(width, height):
+    return riff(b"VP8 ", b"\x00\x00\x00" + b"\x9d\x01\x2a" + struct.pack("<HH", width, height) + b"\x00" * 8)
+
+
+def webp_vp8l(width, height):
+    bits = (width - 1) | (height - 1) << 14
+    return riff(b"VP8L", b"\x2f" + struct.pack("<I", bits) + b"\x00" * 8)
+
+
+def webp_vp8x(width, height):
+    return riff(b"VP8X", b"\x00" * 4 + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little"))
+
+
+@pytest.mark.parametrize("name, data, size", [
+    ("a.png", png(1920, 1080), (1920, 1080)),
+    ("b.jpg", jpeg(640, 480), (640, 480)),
+    ("c.jpg", jpeg(640, 480, sof=0xC2), (640, 480)),
+    ("d.jpg", jpeg(640, 480, segment(0xE0, b"JFIF\x00" + b"\x00" * 9), exif(6)), (480, 640)),
+    ("e.jpg", jpeg(640, 480, exif(8, ">")), (480, 640)),
+    ("f.jpg", jpeg(640, 480, exif(3)), (640, 480)),
+    ("g.jpg", jpeg(640, 480, segment(0xE1, b"http://ns.adobe.com/xap/1.0/\x00")), (640, 480)),
+    ("h.webp", webp_vp8(1000, 750), (1000, 750)),
+    ("i.webp", webp_vp8l(16383, 1), (16383, 1)),
+    ("j.webp", webp_vp8x(20000, 300), (20000, 300)),
+])
+def test_read_image_size(tmp_path, name, data, size):
+    path = tmp_path / name
+    path.write_bytes(data)
+    assert tuple(read_image_size(str(path))) == size
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"GIF89a" + b"\x00" * 30,
+    png(10, 10)[:20],
+    jpeg(640, 480)[:9],
+    b"\xff\xd8" + segment(0xDA, b"\x00" * 4),
+    b"RIFF\x00\x00\x00\x00WEBPVP8 ",
+])
+def test_unreadable_headers(tmp_path, data):
+    path = tmp_path / "broken.png"
+    path.write_bytes(data)
+    assert read_image_size(str(path)) is None
+
+
+def test_scan_images(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "wide.png").write_bytes(png(2048, 512))
+    (tmp_path / "square.jpg").write_bytes(jpeg(512, 512))
+    (tmp_path / "broken.webp").write_bytes(b"RIFF")
+    (tmp_path / "notes.txt").write_text("not an image")
+    assert list(iter_image_files(str(tmp_path))) == ["broken.webp", "square.jpg", "sub/wide.png"]
+    rows = list(scan_images(str(tmp_path), jobs=1))
+    assert [row[:5] for row in rows] == [
+        ("square.jpg", 512, 512, 1024, 1024),
+        ("sub/wide.png", 2048, 512, 2048, 512),
+    ]
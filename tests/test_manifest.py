@@ -0,0 +1,91 @@
+import os
+
+from gptc.manifest import Manifest, content_hash
+
+
+def write(manifest, key, path, text="text"):
+    with open(os.path.join(manifest.output_dir, path), "w", encoding="utf-8") as f:
+        f.write(text)
+    manifest.record(key, path)
+
+
+def first_run(output_dir):
+    manifest = Manifest.load(output_dir, "settings")
+    for conversation_id, path in (("a", "a.md"), ("b", "b.md")):
+        key = manifest.stage(conversation_id, 1.0, content_hash(conversation_id.encode()))
+        write(manifest, key, path)
+    manifest.complete = True
+    manifest.save()
+
+
+def test_unchanged_after_reload(tmp_path):
+    first_run(str(tmp_path))
+    manifest = Manifest.load(str(tmp_path), "settings")
+    assert manifest.unchanged(content_hash(b"a"))
+    assert not manifest.unchanged(content_hash(b"changed"))
+    assert manifest.seen == {"a"}
+
+
+def test_unchanged_needs_the_file_and_the_same_settings(tmp_path):
+    first_run(str(tmp_path))
+    os.remove(tmp_path / "b.md")
+    manifest = Manifest.load(str(tmp_path), "settings")
+    assert not manifest.unchanged(content_hash(b"b"))
+    assert not Manifest.load(str(tmp_path), "other settings").unchanged(content_hash(b"a"))
+
+
+def test_unchanged_can_be_vetoed(tmp_path):
+    first_run(str(tmp_path))
+    manifest = Manifest.load(str(tmp_path), "settings")
+    assert not manifest.unchanged(content_hash(b"a"), is_current=lambda cid, update_time: False)
+
+
+def test_record_replaces_a_renamed_file(tmp_path):
+    first_run(str(tmp_path))
+    manifest = Manifest.load(str(tmp_path), "settings")
+    key = manifest.stage("a", 2.0, content_hash(b"a v2"))
+    write(manifest, key, "renamed.md")
+    assert not (tmp_path / "a.md").exists()
+    assert manifest.entries["a"] == {"update_time": 2.0, "hash": content_hash(b"a v2"), "path": "renamed.md"}
+    assert manifest.paths()["renamed.md"] == "a"
+
+
+def test_stage_keys_conversations_without_or_with_duplicate_ids(tmp_path):
+    manifest = Manifest(str(tmp_path), "settings")
+    digest = content_hash(b"x")
+    keys = [manifest.stage(None, 1.0, digest), manifest.stage(None, 1.0, digest),
+            manifest.stage("a", 1.0, content_hash(b"a")), manifest.stage("a", 1.0, content_hash(b"a2"))]
+    assert keys == [digest, f"{digest}-2", "a", content_hash(b"a2")]
+    for number, key in enumerate(keys):
+        write(manifest, key, f"{number}.md")
+    assert len(manifest.entries) == 4
+
+
+def test_prune_removes_what_was_not_seen(tmp_path):
+    first_run(str(tmp_path))
+    manifest = Manifest.load(str(tmp_path), "settings")
+    assert manifest.unchanged(content_hash(b"a"))
+    assert manifest.prune() == 0  # The export was not read to the end.
+    manifest.complete = True
+    assert manifest.prune() == 1
+    assert (tmp_path / "a.md").exists()
+    assert not (tmp_path / "b.md").exists()
+    assert list(manifest.entries) == ["a"]
+
+
+def test_changed_conversation_without_id_takes_over_its_file(tmp_path):
+    manifest = Manifest(str(tmp_path), "settings")
+    write(manifest, manifest.stage(None, 1.0, content_hash(b"v1")), "untitled-1.md")
+    write(manifest, manifest.stage("a", 1.0, content_hash(b"a")), "a.md")
+    manifest.complete = True
+    manifest.save()
+
+    manifest = Manifest.load(str(tmp_path), "settings")
+    assert manifest.reclaimable("untitled-1.md")
+    assert not manifest.reclaimable("a.md")  # Conversations with an id keep their key.
+    key = manifest.stage(None, 2.0, content_hash(b"v2"))
+    write(manifest, key, "untitled-1.md", "v2")
+    assert manifest.paths() == {"a.md": "a", "untitled-1.md": key}
+    assert not manifest.unchanged(content_hash(b"v1"))
+    assert (tmp_path / "untitled-1.md").read_text(encoding="utf-8") == "v2"
+    assert not manifest.reclaimable("untitled-1.md")
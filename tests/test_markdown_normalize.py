@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from gptc.markdown_normalize import MarkdownNormalizer, closes_fence, normalize_chunks, normalize_markdown
+
+SAMPLE = (
+    "# Title\n"
+    "\n\n\n"
+    "Some text.\n"
+    "## Question?\n"
+    "### Closed heading ###\n"
+    "```\n"
+    "# not a heading\n"
+    "\n\n\n"
+    "```python\n"
+    "```\n"
+    "\n  \n\n"
+    "~~~~python\n"
+    "x = 1\n"
+    "~~~\n"
+    "still code\n"
+    "~~~~\n"
+    "#hashtag, not a heading\n"
+    "  ## Indented\n"
+    "last line without newline"
+)
+
+EXPECTED = (
+    "# Title.\n"
+    "\n"
+    "Some text.\n"
+    "## Question?\n"
+    "### Closed heading. ###\n"
+    "```text\n"
+    "# not a heading\n"
+    "\n\n\n"
+    "```python\n"
+    "```\n"
+    "\n"
+    "~~~~python\n"
+    "x = 1\n"
+    "~~~\n"
+    "still code\n"
+    "~~~~\n"
+    "#hashtag, not a heading\n"
+    "  ## Indented.\n"
+    "last line without newline"
+)
+
+
+def test_normalize_markdown():
+    assert normalize_markdown(SAMPLE) == EXPECTED
+
+
+def split(text, sizes):
+    chunks = []
+    pos = 0
+    for size in sizes:
+        chunks.append(text[pos:pos + size])
+        pos += size
+    chunks.append(text[pos:])
+    return chunks
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13])
+def test_same_output_for_fixed_size_chunks(size):
+    chunks = [SAMPLE[i:i + size] for i in range(0, len(SAMPLE), size)]
+    assert "".join(normalize_chunks(chunks)) == EXPECTED
+
+
+def test_same_output_for_random_splits():
+    rng = random.Random(1234)
+    text = SAMPLE * 20
+    expected = normalize_markdown(text)
+    for _ in range(200):
+        chunks = split(text, [rng.randint(0, 12) for _ in range(rng.randint(0, 300))])
+        assert "".join(normalize_chunks(chunks)) == expected
+
+
+def test_split_at_every_position():
+    for pos in range(len(SAMPLE) + 1):
+        normalizer = MarkdownNormalizer()
+        out = normalizer.feed(SAMPLE[:pos]) + normalizer.feed(SAMPLE[pos:]) + normalizer.close()
+        assert out == EXPECTED, pos
+
+
+def test_empty_input():
+    assert normalize_markdown("") == ""
+    assert list(normalize_chunks([])) == []
+    assert list(normalize_chunks(["", ""])) == []
+
+
+def test_closes_fence():
+    assert closes_fence("```", "```")
+    assert closes_fence("  ````  ", "```")
+    assert not closes_fence("``", "```")
+    assert not closes_fence("~~~", "```")
+    assert not closes_fence("```python", "```")
@@ -0,0 +1,57 @@
+import json
+
+from gptc.merge import merge_snapshots
+from gptc.stream_reader import iter_conversations
+
+
+def conversation(conversation_id, update_time, title="T"):
+    return {"id": conversation_id, "title": title, "update_time": update_time, "mapping": {}}
+
+
+def write_snapshot(path, conversations):
+    path.write_text(json.dumps(conversations), encoding="utf-8")
+    return str(path)
+
+
+def test_newest_version_wins(tmp_path):
+    old = write_snapshot(tmp_path / "old.json", [
+        conversation("a", 1, "a old"),
+        conversation("b", 5, "b newest"),
+        conversation("gone", 1),
+    ])
+    new = write_snapshot(tmp_path / "new.json", [
+        conversation("a", 2, "a new"),
+        conversation("b", 3, "b older"),
+        conversation("c", 1),
+    ])
+    output = str(tmp_path / "merged.json")
+    stats = merge_snapshots([old, new], output)
+
+    merged = {c["id"]: c["title"] for c in iter_conversations(output)}
+    assert merged == {"a": "a new", "b": "b newest", "c": "T", "gone": "T"}
+    assert stats["read"] == 6
+    assert stats["superseded"] == 2
+    assert stats["written"] == 4
+
+
+def test_ties_go_to_the_last_snapshot_and_identical_copies_are_written_once(tmp_path):
+    first = write_snapshot(tmp_path / "1.json", [conversation("a", 1, "first"), conversation("b", 1)])
+    second = write_snapshot(tmp_path / "2.json", [conversation("a", 1, "second"), conversation("b", 1)])
+    output = str(tmp_path / "merged.json")
+    stats = merge_snapshots([first, second], output)
+
+    merged = list(iter_conversations(output))
+    assert [c["id"] for c in merged] == ["a", "b"]
+    assert merged[0]["title"] == "second"
+    assert stats["identical"] == 1
+    assert stats["written"] == 2
+
+
+def test_conversations_without_id_are_kept_per_content(tmp_path):
+    untitled = {"title": "no id", "mapping": {}}
+    other = {"title": "other", "mapping": {}}
+    first = write_snapshot(tmp_path / "1.json", [untitled, other])
+    second = write_snapshot(tmp_path / "2.json", [untitled])
+    output = str(tmp_path / "merged.json")
+    merge_snapshots([first, second], output)
+    assert sorted(c["title"] for c in iter_conversations(output)) == ["no id", "other"]
@@ -0,0 +1,70 @@
+from gptc.output_writer import FilenameAllocator, OutputWriter, conversation_filename, slugify
+
+
+def test_slugify():
+    assert slugify("Python: Decorators & You!") == "python-decorators-you"
+    assert slugify("") == "untitled"
+    assert slugify("???") == "untitled"
+    assert len(slugify("word " * 50)) <= 60
+
+
+def test_conversation_filename():
+    assert conversation_filename("Hello", "1a2b3c4d-5e6f") == "hello-1a2b3c4d.md"
+    assert conversation_filename("Hello", None, index=4) == "hello-5.md"
+
+
+def test_distinct_ids_with_the_same_title_and_short_id():
+    allocator = FilenameAllocator()
+    first = allocator.allocate("Hello", "1a2b3c4d-aaaa")
+    second = allocator.allocate("Hello", "1a2b3c4d-bbbb")
+    assert first == "hello-1a2b3c4d.md"
+    assert second == "hello-1a2b3c4dbbbb.md"
+
+
+def test_counter_is_the_last_resort():
+    allocator = FilenameAllocator()
+    names = [allocator.allocate("Hello", "same-id") for _ in range(3)]
+    assert names[0] == "hello-sameid.md"
+    # The full id is no longer than the short one, so only a counter is left.
+    assert names[1:] == ["hello-sameid-2.md", "hello-sameid-3.md"]
+
+
+def test_conversations_without_id_are_told_apart_by_position():
+    allocator = FilenameAllocator()
+    assert allocator.allocate("Hello", None, 0) == "hello-1.md"
+    assert allocator.allocate("Hello", None, 1) == "hello-2.md"
+
+
+def test_reserved_names_are_kept_for_their_owner():
+    allocator = FilenameAllocator({"hello-1a2b3c4d.md": "1a2b3c4d-aaaa"})
+    assert allocator.allocate("Hello", "1a2b3c4d-bbbb") == "hello-1a2b3c4dbbbb.md"
+    assert allocator.allocate("Hello", "1a2b3c4d-aaaa") == "hello-1a2b3c4d.md"
+
+
+def test_allocation_is_deterministic():
+    requests = [("Hello", "1a2b3c4d-aaaa"), ("Hello", "1a2b3c4d-bbbb"), ("Hello", None), ("Hello", "same")] * 3
+    runs = []
+    for _ in range(2):
+        allocator = FilenameAllocator()
+        runs.append([allocator.allocate(title, cid, i) for i, (title, cid) in enumerate(requests)])
+    assert runs[0] == runs[1]
+    assert len(set(runs[0])) == len(requests)
+
+
+def test_output_writer(tmp_path):
+    done = []
+    with OutputWriter(str(tmp_path), threads=2) as writer:
+        for i in range(20):
+            writer.write(f"sub/{i}.md", f"text {i}", lambda i=i: done.append(i))
+    assert done == list(range(20))
+    assert (tmp_path / "sub" / "7.md").read_text(encoding="utf-8") == "text 7"
+    assert writer.failures == 0
+
+
+def test_changed_conversation_without_id_reclaims_its_name():
+    reserved = {"hello-1.md": "old digest", "hello-2.md": "other digest"}
+    allocator = FilenameAllocator(reserved, reclaimable=lambda name: name == "hello-1.md")
+    assert allocator.allocate("Hello", None, 0, "new digest") == "hello-1.md"
+    assert allocator.allocate("Hello", None, 1, "another digest") == "hello-2-2.md"
+    # A name handed out in this run cannot be reclaimed.
+    assert allocator.allocate("Hello", None, 0, "third digest") == "hello-1-2.md"
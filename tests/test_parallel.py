@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+from gptc.main import main
+from gptc.synthetic_export import write_export
+
+
+@pytest.fixture(scope="module")
+def export(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("export")
+    path = directory / "conversations.json"
+    write_export(str(path), conversations=40, messages=6, part_size=200, seed=5)
+    conversations = json.loads(path.read_text(encoding="utf-8"))
+    # Conversations without an id, with a duplicate id, and one that cannot be linearized.
+    untitled = dict(conversations[0], title="No id")
+    untitled.pop("id", None)
+    untitled.pop("conversation_id", None)
+    broken = dict(conversations[2], id="broken", current_node="a",
+                  mapping={"a": {"id": "a", "parent": None, "children": [], "message": "not a message"}})
+    conversations[10:10] = [untitled, dict(untitled), dict(conversations[1], title="Same id"), broken]
+    path.write_text(json.dumps(conversations), encoding="utf-8")
+    return str(path)
+
+
+def write_config(directory, single_file_output):
+    path = directory / "config.toml"
+    path.write_text(f"single_file_output = {str(single_file_output).lower()}\n"
+                    "volume_size_mb = 0\n", encoding="utf-8")
+    return str(path)
+
+
+def read_tree(root):
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+@pytest.mark.parametrize("single_file_output", [False, True])
+def test_serial_and_parallel_output_are_identical(tmp_path, export, single_file_output):
+    config = write_config(tmp_path, single_file_output)
+    outputs = {}
+    for jobs in (1, 3):
+        root = tmp_path / f"jobs-{jobs}"
+        root.mkdir()
+        output = str(root / "all.md") if single_file_output else str(root / "out")
+        stats = main(export, config, output, jobs=jobs, incremental=not single_file_output)
+        outputs[jobs] = read_tree(str(root)), dict(stats.counters)
+    (serial_files, serial_counters), (parallel_files, parallel_counters) = outputs[1], outputs[3]
+    assert serial_files == parallel_files
+    assert serial_counters == parallel_counters
+    assert serial_counters["conversations"] == 44 and serial_counters["failed"] == 1
+
+
+def test_incremental_reruns_agree(tmp_path, export):
+    config = write_config(tmp_path, False)
+    counters = {}
+    for jobs in (1, 3):
+        output = str(tmp_path / f"out-{jobs}")
+        main(export, config, output, jobs=jobs, incremental=True)
+        counters[jobs] = dict(main(export, config, output, jobs=jobs, incremental=True).counters)
+    assert counters[1] == counters[3]
+    # The conversation that failed is tried again.
+    assert counters[1]["unchanged"] == 43 and counters[1]["failed"] == 1
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_unreadable_exports(tmp_path, export, jobs):
+    config = write_config(tmp_path, False)
+    missing = main(str(tmp_path / "missing.json"), config, str(tmp_path / "missing"), jobs=jobs)
+    assert dict(missing.counters) == {"errors": 1}
+
+    truncated = tmp_path / "truncated.json"
+    with open(export, "rb") as f:
+        data = f.read()
+    truncated.write_bytes(data[:len(data) // 2])
+    output = tmp_path / "out"
+    stats = main(str(truncated), config, str(output), jobs=jobs, incremental=True)
+    assert stats.counters["errors"] == 1
+    assert 0 < stats.counters["conversations"] < 44
+    written = [name for name in os.listdir(output) if name.endswith(".md")]
+    assert len(written) == stats.counters["conversations"] - stats.counters["failed"]
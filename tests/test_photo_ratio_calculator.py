@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from gptc.photo_ratio_calculator import SDXL_RESOLUTIONS, assign_buckets, bucket_table, nearest_bucket
+
+
+def brute_force_bucket(width, height):
+    """The bucket with the nearest log-aspect, ties going to the smaller aspect ratio."""
+    table = bucket_table()
+    distances = np.abs(table.log_aspect - np.log(width / height))
+    nearest = np.flatnonzero(distances == distances.min())
+    return nearest[np.argmin(table.log_aspect[nearest])]
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(20)
+    widths = rng.integers(1, 8000, 5000)
+    heights = rng.integers(1, 8000, 5000)
+    assignment = assign_buckets(widths, heights)
+    expected = [brute_force_bucket(w, h) for w, h in zip(widths, heights)]
+    assert assignment.bucket.tolist() == expected
+
+
+def test_bucket_sizes_map_to_themselves():
+    widths, heights = zip(*SDXL_RESOLUTIONS)
+    assignment = assign_buckets(widths, heights)
+    assert assignment.bucket.tolist() == list(range(len(SDXL_RESOLUTIONS)))
+    assert np.all(assignment.scale == 1.0)
+    assert np.all(assignment.crop_left == 0) and np.all(assignment.crop_top == 0)
+
+
+def test_extreme_aspects_go_to_the_outermost_buckets():
+    assert nearest_bucket(100000, 1) == (2048, 512)
+    assert nearest_bucket(1, 100000) == (512, 2048)
+    assert nearest_bucket(3000, 3000) == (1024, 1024)
+
+
+def test_scaled_image_covers_its_bucket():
+    rng = np.random.default_rng(19)
+    widths = rng.integers(1, 6000, 2000)
+    heights = rng.integers(1, 6000, 2000)
+    a = assign_buckets(widths, heights)
+    assert np.all(a.resized_width >= a.width) and np.all(a.resized_height >= a.height)
+    # One side fits the bucket exactly, give or take rounding.
+    assert np.all((np.abs(a.resized_width - a.width) <= 1) | (np.abs(a.resized_height - a.height) <= 1))
+    assert np.all(a.crop_left == (a.resized_width - a.width) // 2)
+    assert np.all(a.crop_top == (a.resized_height - a.height) // 2)
+
+
+def test_empty_and_invalid_input():
+    assert assign_buckets([], []).bucket.size == 0
+    with pytest.raises(ValueError):
+        assign_buckets([10, 20], [10])
+    with pytest.raises(ValueError):
+        assign_buckets([0], [10])
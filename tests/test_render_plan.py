@@ -0,0 +1,72 @@
+import re
+
+import pytest
+
+from gptc.models import Conversation, Message
+from gptc.render_plan import DEFAULT_CONFIG, ConfigError, RenderPlan, load_plan, merge_config
+
+
+def test_merge_config_fills_in_defaults():
+    merged = merge_config({"include_update_time": True, "message": {"include_status": True}})
+    assert merged["include_update_time"] is True
+    assert merged["message"]["include_status"] is True
+    assert merged["message"]["include_parts"] is True
+    # The defaults themselves are not modified.
+    assert DEFAULT_CONFIG["message"]["include_status"] is False
+
+
+@pytest.mark.parametrize("config, message", [
+    ({"include_titel": True}, "Did you mean 'include_title'?"),
+    ({"message": {"include_parst": True}}, "[message] 'include_parst'"),
+    ({"metadata": {"unknown": True}}, "Unknown configuration key [metadata] 'unknown'."),
+])
+def test_merge_config_rejects_unknown_keys(config, message):
+    with pytest.raises(ConfigError, match=re.escape(message)):
+        merge_config(config)
+
+
+@pytest.mark.parametrize("config", [
+    {"include_title": "yes"},
+    {"include_title": 1},
+    {"message": True},
+    {"message": {"include_parts": 0}},
+    {"volume_size_mb": True},
+    {"volume_size_mb": -1},
+    {"volume_size_mb": 1.5},
+])
+def test_merge_config_rejects_wrong_types(config):
+    with pytest.raises(ConfigError):
+        merge_config(config)
+
+
+def test_load_plan_errors(tmp_path):
+    with pytest.raises(ConfigError, match="Cannot read"):
+        load_plan(str(tmp_path / "missing.toml"))
+    bad = tmp_path / "bad.toml"
+    bad.write_text("include_title = \n", encoding="utf-8")
+    with pytest.raises(ConfigError, match="Invalid configuration file"):
+        load_plan(str(bad))
+
+
+def test_load_plan_is_cached_by_content(tmp_path):
+    first = tmp_path / "a.toml"
+    second = tmp_path / "b.toml"
+    first.write_text("include_update_time = true\n", encoding="utf-8")
+    second.write_text("include_update_time = true\n", encoding="utf-8")
+    assert load_plan(str(first)) is load_plan(str(second))
+    assert load_plan(str(first)).fingerprint != load_plan().fingerprint
+
+
+def test_render_enabled_fields_only():
+    plan = RenderPlan(merge_config({"single_file_output": False, "metadata": {"include_model_slug": True}}))
+    thread = Conversation("c1", "Title", 0.0, 1.0, [
+        Message(role="user", content_type="text", parts=["Hello"]),
+        Message(role="system", content_type="text", parts=[""]),
+        Message(role="assistant", content_type="text", parts=["Hi", "there"], model_slug="gpt-4"),
+    ])
+    assert plan.render(plan.extract(thread)) == (
+        "# Title\n\n"
+        "**Created**: 1970-01-01 00:00:00 UTC\n\n"
+        "## User\n\n**Content type**: text\n\n**Model**: None\n\nHello\n\n"
+        "## Assistant\n\n**Content type**: text\n\n**Model**: gpt-4\n\nHi\n\nthere\n\n"
+    )
@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+
+from gptc.models import Conversation, Message
+from gptc.search_index import SearchIndex, fts_query
+
+
+@pytest.mark.parametrize("text, query", [
+    ("decorator", "decorator"),
+    ("gpt-4", '"gpt-4"'),
+    ("c++ templates", '"c++" templates'),
+    ("gpt-4*", '"gpt-4"*'),
+    ("(gpt-4 OR c++)", '("gpt-4" OR "c++")'),
+    ("click AND decorator", "click AND decorator"),
+    ("deco*", "deco*"),
+    ('"exact phrase"', '"exact phrase"'),
+    ("title:python", "title:python"),
+    ("example.com/path", '"example.com/path"'),
+    ("naïve café", "naïve café"),
+])
+def test_fts_query(text, query):
+    assert fts_query(text) == query
+
+
+@pytest.mark.parametrize("text", ["c++", "gpt-4*", "(gpt-4 OR c++)", "x.y/z", "title:python", "^deco"])
+def test_fts_query_is_valid(tmp_path, text):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    index.search(fts_query(text))
+
+
+def thread(conversation_id, update_time, *texts):
+    messages = [Message(role="user", parts=[text], create_time=1.0) for text in texts]
+    return Conversation(conversation_id, f"Title {conversation_id}", 0.0, update_time, messages)
+
+
+def rows(index):
+    return index.connection.execute(
+        "SELECT rowid, conversation_id, text FROM messages ORDER BY rowid").fetchall()
+
+
+def test_search(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    index.add(thread("a", 1.0, "How do I use gpt-4 for code?", "Another message"))
+    index.add(thread("b", 1.0, "Nothing relevant"))
+    results = index.search(fts_query("gpt-4"))
+    assert [result[4] for result in results] == ["a"]
+    assert "[gpt-4]" in results[0][5]
+
+
+def test_updated_conversation_replaces_its_rowid_range(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    index.add(thread("a", 1.0, "one", "two"))
+    index.add(thread("b", 1.0, "three"))
+    assert rows(index) == [(1, "a", "one"), (2, "a", "two"), (3, "b", "three")]
+
+    index.add(thread("a", 1.0, "ignored"))
+    assert index.skipped == 1
+
+    index.add(thread("a", 2.0, "four", "five", "six"))
+    assert rows(index) == [(3, "b", "three"), (4, "a", "four"), (5, "a", "five"), (6, "a", "six")]
+    assert index.connection.execute(
+        "SELECT first_row, last_row, update_time FROM conversations WHERE id = 'a'").fetchone() == (4, 6, 2.0)
+    assert index.search("one") == []
+
+    index.add(thread("b", 2.0))
+    assert [row[1] for row in rows(index)] == ["a", "a", "a"]
+    assert index.is_current("b", 2.0)
+
+
+def test_read_only(tmp_path):
+    path = str(tmp_path / "index.db")
+    with pytest.raises(sqlite3.OperationalError):
+        SearchIndex(path, read_only=True)
+    assert not (tmp_path / "index.db").exists()
+
+    index = SearchIndex(path)
+    index.add(thread("a", 1.0, "hello"))
+    index.close()
+    index = SearchIndex(path, read_only=True)
+    assert len(index.search("hello")) == 1
+    with pytest.raises(sqlite3.OperationalError):
+        index.add(thread("b", 1.0, "world"))
+    index.close()
@@ -0,0 +1,81 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from gptc.stream_reader import SCAN_DEPTH, iter_conversations, iter_items, iter_raw_conversations, iter_raw_items
+
+CONVERSATIONS = [
+    {"id": "a", "title": "Brackets ] } in \"strings\" \\", "mapping": {}},
+    {"id": "b", "title": "Ünïcödé ✓ 😀", "mapping": {"n": {"children": [], "parent": None}}},
+    {"id": "c", "title": "deep", "value": json.loads("[" * (SCAN_DEPTH + 5) + "]" * (SCAN_DEPTH + 5))},
+    {"id": "d", "title": "", "numbers": [1, -2.5e3, True, None]},
+]
+EXPORT = json.dumps(CONVERSATIONS, ensure_ascii=False, indent=1).encode("utf-8")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_items_survive_any_chunk_boundary(chunk_size):
+    assert list(iter_items(io.BytesIO(EXPORT), chunk_size)) == CONVERSATIONS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_raw_items_survive_any_chunk_boundary(chunk_size):
+    raw = list(iter_raw_items(io.BytesIO(EXPORT), chunk_size))
+    assert [json.loads(item) for item in raw] == CONVERSATIONS
+    assert all(isinstance(item, bytes) for item in raw)
+
+
+def test_byte_order_mark_is_skipped():
+    data = b"\xef\xbb\xbf" + EXPORT
+    assert list(iter_items(io.BytesIO(data), 2)) == CONVERSATIONS
+    assert [json.loads(raw) for raw in iter_raw_items(io.BytesIO(data), 2)] == CONVERSATIONS
+
+
+@pytest.mark.parametrize("data", [b'[{"a": 1}', b'[{"a": 1}, {"b": ', b'[{"a": "unterminated'])
+@pytest.mark.parametrize("reader", [iter_items, iter_raw_items])
+def test_truncated_export_raises(reader, data):
+    with pytest.raises(ValueError):
+        list(reader(io.BytesIO(data), 4))
+
+
+@pytest.mark.parametrize("data", [b"", b"   ", b'{"a": 1}'])
+@pytest.mark.parametrize("reader", [iter_items, iter_raw_items])
+def test_not_an_array_raises(reader, data):
+    with pytest.raises(ValueError):
+        list(reader(io.BytesIO(data)))
+
+
+def test_empty_array():
+    assert list(iter_items(io.BytesIO(b" [ ] "))) == []
+    assert list(iter_raw_items(io.BytesIO(b" [ ] "))) == []
+
+
+def test_plain_file_with_raw_and_select(tmp_path):
+    path = tmp_path / "conversations.json"
+    path.write_bytes(EXPORT)
+    pairs = list(iter_conversations(str(path), chunk_size=3, with_raw=True))
+    assert [value for value, _ in pairs] == CONVERSATIONS
+    assert [json.loads(raw) for _, raw in pairs] == CONVERSATIONS
+
+    selected = list(iter_raw_conversations(str(path), select=lambda c: c["id"] in ("b", "d")))
+    assert [json.loads(raw)["id"] for raw in selected] == ["b", "d"]
+
+
+def test_zip_member(tmp_path):
+    archive = tmp_path / "export.zip"
+    with zipfile.ZipFile(archive, "w") as z:
+        z.writestr("chat.html", "<html></html>")
+        z.writestr("nested/conversations.json", b"[]")
+        z.writestr("conversations.json", EXPORT)
+    assert list(iter_conversations(str(archive), chunk_size=5)) == CONVERSATIONS
+    assert [json.loads(raw) for raw in iter_raw_conversations(str(archive), chunk_size=5)] == CONVERSATIONS
+
+
+def test_zip_without_export(tmp_path):
+    archive = tmp_path / "export.zip"
+    with zipfile.ZipFile(archive, "w") as z:
+        z.writestr("chat.html", "<html></html>")
+    with pytest.raises(ValueError):
+        list(iter_conversations(str(archive)))
@@ -0,0 +1,55 @@
+import os
+
+from gptc.volumes import SEPARATOR, VolumeWriter, read_conversation, read_toc, toc_path, volume_path
+
+TEXTS = [f"# Conversation {i} ✓\n\n" + "é" * (i * 37) + "\n" for i in range(12)]
+
+
+def write_all(output_path, volume_size):
+    with VolumeWriter(output_path, volume_size) as writer:
+        for i, text in enumerate(TEXTS):
+            writer.write(f"id-{i}", f"Title {i}", text)
+    return read_toc(toc_path(output_path))
+
+
+def check_toc(output_path, toc):
+    base = os.path.dirname(toc_path(output_path))
+    volumes = [open(os.path.join(base, name), "rb").read() for name in toc["volumes"]]
+    for i, entry in enumerate(toc["conversations"]):
+        data = volumes[entry["volume"]][entry["offset"]:entry["offset"] + entry["length"]]
+        assert data == TEXTS[i].encode("utf-8")
+        assert read_conversation(toc_path(output_path), entry) == TEXTS[i]
+        assert (entry["id"], entry["title"]) == (f"id-{i}", f"Title {i}")
+    # The volumes hold exactly the conversations and the separators between them.
+    for number, volume in enumerate(volumes):
+        entries = [e for e in toc["conversations"] if e["volume"] == number]
+        assert len(volume) == sum(e["length"] for e in entries) + len(SEPARATOR) * (len(entries) - 1)
+    return volumes
+
+
+def test_single_file(tmp_path):
+    output = str(tmp_path / "all.md")
+    toc = write_all(output, 0)
+    assert toc["volumes"] == ["all.md"]
+    check_toc(output, toc)
+
+
+def test_volumes_respect_the_size(tmp_path):
+    output = str(tmp_path / "all.md")
+    volume_size = 600
+    toc = write_all(output, volume_size)
+    assert toc["volumes"][0] == os.path.basename(volume_path(output, 1)) == "all.001.md"
+    volumes = check_toc(output, toc)
+    assert len(volumes) > 1
+    for number, volume in enumerate(volumes):
+        alone = sum(e["volume"] == number for e in toc["conversations"]) == 1
+        # Only a conversation larger than the volume size may exceed it, on its own.
+        assert len(volume) <= volume_size or alone
+
+
+def test_leftover_volumes_are_removed(tmp_path):
+    output = str(tmp_path / "all.md")
+    first = write_all(output, 300)
+    second = write_all(output, 100000)
+    assert len(second["volumes"]) == 1 < len(first["volumes"])
+    assert sorted(os.listdir(tmp_path)) == ["all.001.md", "all.md.toc.json"]